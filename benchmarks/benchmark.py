@@ -0,0 +1,168 @@
+"""Benchmarks the search on synthetic graphs.
+
+Every combination of graph, search heuristic and path pruner runs in a fresh process, so that peak memory usage
+is measured per run. Graphs are generated with fixed seeds, so repeated runs explore exactly the same paths.
+
+Run from the root of the repository::
+
+    python -m benchmarks.benchmark --output baseline.json
+    python -m benchmarks.benchmark --compare baseline.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import platform
+import sys
+import time
+from typing import Dict, List, Optional
+
+from dedalov2 import ddl
+from dedalov2 import explanation_evaluation
+from dedalov2 import knowledge_graph
+from dedalov2 import local_hdt
+from dedalov2.path_evaluation import HEURISTIC_NAMES
+from dedalov2.path_pruner import PATH_PRUNER_NAMES
+from dedalov2.result_cache import Recorder
+
+from .synthetic import SyntheticGraph
+
+LOG = logging.getLogger('dedalov2.benchmark')
+
+GRAPHS: Dict[str, Dict] = {
+    "small": dict(num_examples=50, level_size=1000, depth=3, num_predicates=50, fanout=8, skew=1.5),
+    "skewed": dict(num_examples=50, level_size=1000, depth=3, num_predicates=50, fanout=8, skew=1.1),
+    "deep": dict(num_examples=50, level_size=500, depth=6, num_predicates=20, fanout=4, skew=1.5),
+    "wide": dict(num_examples=200, level_size=10000, depth=2, num_predicates=200, fanout=32, skew=1.5),
+}
+
+# Measurements that must not get worse, and whether higher values are better.
+METRICS: Dict[str, bool] = {
+    "triples_per_second": True,
+    "rounds_per_second": True,
+    "time_to_first_explanation": False,
+    "peak_rss": False,
+}
+# Counts that only change if the search itself changes.
+COUNTS = ("rounds", "explanations", "paths")
+
+
+def peak_rss() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_case(case: Dict) -> Dict:
+    graph = SyntheticGraph(seed=case["seed"], **GRAPHS[case["graph"]])
+    local_hdt.doc = graph
+    knowledge_graph.clear_interned()
+    examples = graph.examples()
+    pruner = PATH_PRUNER_NAMES[case["prune"]](explanation_evaluation.max_fuzzy_f_measure, examples)
+    recorder = Recorder()
+    first_explanation = None
+    explanations = 0
+    # Hashes instead of paths, so that the benchmark does not keep paths alive.
+    paths = set()
+    start = time.perf_counter()
+    for exp in ddl._explain(examples, pruner, heuristic=HEURISTIC_NAMES[case["heuristic"]], rounds=case["round_limit"],
+                            runtime=case["runtime_limit"] or math.inf, recorder=recorder):
+        if first_explanation is None:
+            first_explanation = time.perf_counter() - start
+        explanations += 1
+        paths.add(hash(exp.path))
+    duration = time.perf_counter() - start
+    res = dict(case)
+    res.update({
+        "triples": graph.triples_read,
+        "graph_triples": graph.num_triples,
+        "rounds": recorder.rounds,
+        "explanations": explanations,
+        "paths": len(paths),
+        "duration": duration,
+        "triples_per_second": graph.triples_read / duration,
+        "rounds_per_second": recorder.rounds / duration,
+        "time_to_first_explanation": first_explanation,
+        "peak_rss": peak_rss(),
+    })
+    return res
+
+
+def run(cases: List[Dict]) -> List[Dict]:
+    results = []
+    for case in cases:
+        with multiprocessing.Pool(processes=1) as pool:
+            res = pool.apply(run_case, (case,))
+        LOG.info("{graph} {heuristic} {prune}: {rounds} ROUNDS {triples_per_second:.0f} TRIPLES/S "
+                 "{rounds_per_second:.1f} ROUNDS/S PATHS: {paths}".format(**res))
+        results.append(res)
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, tolerance: float) -> List[str]:
+    # Returns a description of every measurement that is more than tolerance worse than in the baseline.
+    def name(r: Dict):
+        return (r["graph"], r["heuristic"], r["prune"])
+    old = {name(r): r for r in baseline["results"]}
+    regressions = []
+    for res in results:
+        base = old.get(name(res))
+        if base is None:
+            continue
+        for count in COUNTS:
+            if res[count] != base[count]:
+                LOG.warning("{}: {} CHANGED FROM {} TO {}".format(" ".join(name(res)), count.upper(), base[count], res[count]))
+        for metric, higher_is_better in METRICS.items():
+            new_value, old_value = res[metric], base[metric]
+            if new_value is None or old_value is None or old_value == 0:
+                continue
+            change = (new_value - old_value) / old_value
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append("{}: {} {:.4g} -> {:.4g} ({:+.0%})".format(" ".join(name(res)), metric, old_value, new_value, change))
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark dedalov2 on synthetic graphs.")
+    parser.add_argument("--graphs", nargs="+", choices=GRAPHS, default=list(GRAPHS), help="Graphs to run on.")
+    parser.add_argument("--heuristics", nargs="+", choices=HEURISTIC_NAMES, default=list(HEURISTIC_NAMES), help="Search heuristics to run.")
+    parser.add_argument("--prune", nargs="+", choices=PATH_PRUNER_NAMES, default=list(PATH_PRUNER_NAMES), help="Path pruners to run.")
+    parser.add_argument("--rounds", type=int, default=200, help="Number of rounds per run.")
+    parser.add_argument("--runtime", type=float, default=60, help="Maximum number of seconds per run. 0 means no limit.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed used to generate the graphs.")
+    parser.add_argument("--output", type=str, help="File to write the results to, as JSON.")
+    parser.add_argument("--compare", type=str, help="Baseline file to compare the results with. Exits with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change in a measurement that counts as a regression.")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)-8s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    cases = [dict(graph=g, heuristic=h, prune=p, round_limit=args.rounds,
+                  runtime_limit=args.runtime if args.runtime > 0 else None, seed=args.seed)
+             for g in args.graphs for h in args.heuristics for p in args.prune]
+    results = run(cases)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as fout:
+            json.dump(report, fout, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as fin:
+            regressions = compare(results, json.load(fin), args.tolerance)
+        for regression in regressions:
+            LOG.error("REGRESSION: {}".format(regression))
+        return 1 if len(regressions) > 0 else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import hdt
+
+from dedalov2.example import Example, Examples
+from dedalov2.knowledge_graph import Vertex
+
+Triple = Tuple[int, int, int]
+
+PREFIX = "http://example.org/"
+# Every level has level_size / POOL_FRACTION signal vertices per class.
+POOL_FRACTION = 50
+
+
+class SyntheticGraph:
+    # A layered graph that offers the subset of the hdt.HDTDocument interface used by dedalov2.
+    # Level 0 holds the examples. Every vertex on level d links to vertices on level d+1, so no path is longer than depth.
+    # Both the number of outgoing links and the popularity of predicates and targets follow a power law controlled by skew.
+    # Positive and negative examples mostly link to different targets.
+    # On top of that, a share of signal examples start a chain of links through a pool of vertices of their class on every level,
+    # which ends in a single vertex of their class on the deepest level. The links of each class use one of the least popular predicates.
+    # The vertex of the positive class separates the positive from the negative examples, but only through a path of length depth.
+    # A share of decoy examples start shorter chains with the predicate of the other class, which end before the deepest level.
+    # Paths along the chain of a class therefore lose examples of the other class with every step.
+
+    def __init__(self, num_examples: int = 50, level_size: int = 1000, depth: int = 3, num_predicates: int = 50,
+                 fanout: float = 8, max_fanout: int = 1000, skew: float = 1.5, signal: float = 0.8, decoys: float = 0.4,
+                 seed: int = 0):
+        if skew <= 1:
+            raise ValueError("skew must be larger than 1.")
+        rnd = random.Random(seed)
+        self.depth: int = depth
+        self.level_size: int = level_size
+        self.pool_size: int = max(1, level_size // POOL_FRACTION)
+        self.nb_predicates: int = num_predicates
+        self.num_examples: int = num_examples
+        self.outgoing: Dict[int, List[Triple]] = {}
+        self.incoming: Dict[int, List[Triple]] = {}
+        self.triples_read: int = 0
+        links: Dict[int, Set[Triple]] = {}
+        # Number of decoy chains per class so far. Their lengths take turns, so that every step loses some decoys.
+        num_decoys = {True: 0, False: 0}
+        offset = num_examples
+        sizes = [num_examples] + [level_size] * depth
+        for d in range(depth):
+            for i in range(sizes[d]):
+                s = offset - sizes[d] + i + 1 if d > 0 else i + 1
+                shift = level_size // 2 if d == 0 and i % 2 == 1 else 0
+                num_links = min(max_fanout, int(round(fanout * (rnd.paretovariate(skew) - 1) * (skew - 1))))
+                for _ in range(num_links):
+                    p = int(num_predicates * rnd.random() ** skew) + 1
+                    o = offset + (int(level_size * rnd.random() ** skew) + shift) % level_size + 1
+                    links.setdefault(s, set()).add((s, p, o))
+                positive = self._pool_class(d, s)
+                if positive is not None and (d > 0 or rnd.random() < signal):
+                    pool = self._pool(d + 1, positive)
+                    links.setdefault(s, set()).add((s, self.signal_predicate(positive), pool[rnd.randrange(len(pool))]))
+                if d == 0 and depth > 1 and rnd.random() < decoys:
+                    self._add_decoy(links, s, not positive, num_decoys[positive] % (depth - 1) + 1, rnd)
+                    num_decoys[positive] += 1
+            offset += level_size
+        self.num_vertices: int = offset
+        self.num_triples: int = 0
+        self.add_triples(t for s in sorted(links) for t in sorted(links[s]))
+
+    def add_triples(self, triples: Iterable[Triple]) -> None:
+        # Adds links, for example to give a graph the shape a test needs. Vertex IDs above those of the levels are new vertices.
+        for triple in triples:
+            s, _, o = triple
+            outgoing = self.outgoing.setdefault(s, [])
+            if triple in outgoing:
+                continue
+            outgoing.append(triple)
+            outgoing.sort()
+            self.incoming.setdefault(o, []).append(triple)
+            self.num_vertices = max(self.num_vertices, s, o)
+            self.num_triples += 1
+
+    def _add_decoy(self, links: Dict[int, Set[Triple]], s: int, positive: bool, length: int, rnd: random.Random) -> None:
+        # Links s through length vertices outside the pools with the signal predicate of the given class.
+        for level in range(1, length + 1):
+            o = self._level_start(level) + rnd.randrange(self.level_size) + 1
+            while self._pool_class(level, o) is not None:
+                o = self._level_start(level) + rnd.randrange(self.level_size) + 1
+            links.setdefault(s, set()).add((s, self.signal_predicate(positive), o))
+            s = o
+
+    def _level_start(self, level: int) -> int:
+        return self.num_examples + (level - 1) * self.level_size
+
+    def _pool(self, level: int, positive: bool) -> List[int]:
+        # IDs of the signal vertices of a class on a level. The deepest level has a single one.
+        size = 1 if level == self.depth else self.pool_size
+        start = self._level_start(level) + (self.level_size // 4 if positive else 3 * self.level_size // 4)
+        return list(range(start + 1, start + size + 1))
+
+    def _pool_class(self, level: int, s: int) -> Optional[bool]:
+        # Whether vertex s on the given level starts signal links for positives, for negatives, or for neither.
+        if level == 0:
+            return s % 2 == 1
+        for positive in (True, False):
+            if s in self._pool(level, positive):
+                return positive
+        return None
+
+    def signal_predicate(self, positive: bool = True) -> int:
+        return self.nb_predicates if positive else self.nb_predicates - 1
+
+    def separating_vertex(self, positive: bool = True) -> int:
+        # The vertex that the signal chain of the given class ends in.
+        return self._pool(self.depth, positive)[0]
+
+    def examples(self) -> Examples:
+        # Odd vertices on level 0 are positive examples.
+        examples = Examples()
+        for i in range(1, self.num_examples + 1):
+            examples.add_example(Example(Vertex(s_id=i if i in self.outgoing else 0, o_id=i), i % 2 == 1))
+        return examples
+
+    def search_triples_ids(self, s: int, p: int, o: int) -> Tuple[Iterator[Triple], int]:
+        if s > 0:
+            candidates = self.outgoing.get(s, [])
+        elif o > 0:
+            candidates = self.incoming.get(o, [])
+        else:
+            candidates = [t for triples in self.outgoing.values() for t in triples]
+        res = [t for t in candidates if (p == 0 or t[1] == p) and (o == 0 or t[2] == o)]
+        self.triples_read += len(res)
+        return iter(res), len(res)
+
+    def convert_id(self, id: int, pos: hdt.IdentifierPosition) -> str:
+        if pos == hdt.IdentifierPosition.Predicate:
+            return "{}p{}".format(PREFIX, id)
+        return "{}v{}".format(PREFIX, id)
+
+    def convert_term(self, term: str, pos: hdt.IdentifierPosition) -> int:
+        if not term.startswith(PREFIX):
+            return 0
+        kind, id = term[len(PREFIX)], int(term[len(PREFIX) + 1:])
+        if pos == hdt.IdentifierPosition.Predicate:
+            return id if kind == "p" else 0
+        if kind != "v" or id > self.num_vertices:
+            return 0
+        if pos == hdt.IdentifierPosition.Subject and id not in self.outgoing:
+            return 0
+        return id
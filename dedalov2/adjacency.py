@@ -0,0 +1,100 @@
+import collections
+import logging
+import threading
+from array import array
+from typing import Iterator, Optional, Tuple
+
+from . import local_hdt
+
+LOG = logging.getLogger('dedalov2.adjacency')
+
+# Rough CPython size of a cache entry without its links, and of one (predicate, object) link.
+ENTRY_BYTES = 200
+LINK_BYTES = 2 * array('q').itemsize
+# Vertices with more links than fit in this fraction of the cache are not stored, so that they do not evict everything else.
+MAX_ENTRY_FRACTION = 0.25
+
+
+class AdjacencyCache:
+    # Outgoing links of recently expanded subjects, as flat (predicate ID, object ID) arrays.
+    # The least recently used subjects are evicted once the cache grows beyond max_bytes.
+
+    def __init__(self, max_bytes: float):
+        self.max_bytes: float = max_bytes
+        self.entries: 'collections.OrderedDict[int, array]' = collections.OrderedDict()
+        self.size: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evicted: int = 0
+        # Readers and worker threads share the cache.
+        self.lock = threading.Lock()
+
+    def get(self, s_id: int) -> Optional[array]:
+        with self.lock:
+            links = self.entries.get(s_id)
+            if links is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.entries.move_to_end(s_id)
+            return links
+
+    def fits(self, num_links: int) -> bool:
+        return ENTRY_BYTES + LINK_BYTES * num_links <= self.max_bytes * MAX_ENTRY_FRACTION
+
+    def put(self, s_id: int, links: array) -> None:
+        size = ENTRY_BYTES + LINK_BYTES * (len(links) // 2)
+        if not self.fits(len(links) // 2):
+            return
+        with self.lock:
+            old = self.entries.pop(s_id, None)
+            if old is not None:
+                self.size -= ENTRY_BYTES + LINK_BYTES * (len(old) // 2)
+            self.entries[s_id] = links
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= ENTRY_BYTES + LINK_BYTES * (len(evicted) // 2)
+                self.evicted += 1
+
+    def triples(self, s_id: int) -> Iterator[Tuple[int, int, int]]:
+        # Links that are not cached are passed on while they are read from the HDT file, and stored once all of them are read.
+        # Links of vertices with too many links to store are not collected at all.
+        links = self.get(s_id)
+        if links is not None:
+            for i in range(0, len(links), 2):
+                yield s_id, links[i], links[i + 1]
+            return
+        triples, num_triples = local_hdt.document().search_triples_ids(s_id, 0, 0)
+        if not self.fits(num_triples):
+            yield from triples
+            return
+        links = array('q')
+        for triple in triples:
+            links.append(triple[1])
+            links.append(triple[2])
+            yield triple
+        self.put(s_id, links)
+
+    def put_triples(self, subjects: array, triples_ids: array) -> None:
+        # Stores the outgoing links of the given subjects from flat triples, which are ordered by subject in the same order.
+        i = 0
+        for s_id in subjects:
+            start = i
+            while i < len(triples_ids) and triples_ids[i] == s_id:
+                i += 3
+            if not self.fits((i - start) // 3):
+                continue
+            links = array('q')
+            for j in range(start, i, 3):
+                links.append(triples_ids[j + 1])
+                links.append(triples_ids[j + 2])
+            self.put(s_id, links)
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def log_stats(self) -> None:
+        LOG.debug("ADJACENCY CACHE HITS: {} MISSES: {} HIT RATE: {:.3f} SUBJECTS: {} SIZE: {} BYTES EVICTED: {}".format(
+            self.hits, self.misses, self.hit_rate(), len(self.entries), self.size, self.evicted))
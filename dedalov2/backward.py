@@ -0,0 +1,130 @@
+import heapq
+import logging
+import math
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from . import local_hdt
+from .blacklist import Blacklist
+from .example import Example, Examples
+from .explanation_evaluation import _fuzzy_f_measure
+from .explanation import Explanation
+from .knowledge_graph import Predicate, Vertex
+from .path import Path
+
+LOG = logging.getLogger('dedalov2.backward')
+
+# Number of explanation values to search backward from.
+CANDIDATES = 10
+# Candidates whose backward expansion needs more triples than this are skipped.
+# Their joined explanations would otherwise miss some of the examples they connect to.
+TRIPLE_LIMIT = 100000
+# Candidates are searched among the vertices beyond the forward search until this many triples are read.
+# Subjects with more outgoing triples than TRIPLE_LIMIT are not followed.
+CANDIDATE_TRIPLE_LIMIT = 10 * TRIPLE_LIMIT
+
+BackwardLevel = Dict[Vertex, Set[Tuple[Predicate, Vertex]]]
+
+
+def expand_backward(target: Vertex, depth: int, blacklist: Blacklist = None, limit: int = TRIPLE_LIMIT) -> Optional[List[BackwardLevel]]:
+    # Level k maps every vertex that reaches target in k+1 steps to the (predicate, vertex) pairs that lead one step closer.
+    levels: List[BackwardLevel] = []
+    current: Set[Vertex] = {target}
+    num_triples = 0
+    for _ in range(depth):
+        level: BackwardLevel = {}
+        for o in current:
+            if not o.is_object():
+                continue
+            triples, k = local_hdt.document().search_triples_ids(0, 0, o.o_id)
+            num_triples += k
+            if num_triples > limit:
+                LOG.debug("SKIPPING CANDIDATE {}: MORE THAN {} INCOMING TRIPLES".format(target, limit))
+                return None
+            for s_id, p_id, o_id in triples:
+                if blacklist is not None and blacklist.isBlacklistedId(p_id):
+                    continue
+                p = Predicate.fromId(p_id)
+                level.setdefault(Vertex.fromSubjectId(s_id), set()).add((p, o))
+        levels.append(level)
+        current = set(level.keys())
+    return levels
+
+
+def _by_score(reached: Dict[Vertex, Set[Example]], examples: Examples) -> List[Tuple[Vertex, Set[Example]]]:
+    # The subjects in reached, best first, scored as if a single explanation connected them to the examples that reach them.
+    subjects = [(v, starts) for v, starts in reached.items() if v.is_subject()]
+    subjects.sort(key=lambda item: _fuzzy_f_measure(item[1], examples), reverse=True)
+    return subjects
+
+
+def _follow(subjects: List[Tuple[Vertex, Set[Example]]], blacklist: Optional[Blacklist], limit: float,
+            end_time: float) -> Tuple[Dict[Vertex, Set[Example]], int]:
+    # Returns the objects linked from the given subjects, with the examples that reach them, and the number of triples read.
+    # Subjects are followed in the given order until limit triples are read or the runtime is exceeded.
+    next_reached: Dict[Vertex, Set[Example]] = {}
+    num_triples = 0
+    for v, starts in subjects:
+        if time.time() > end_time:
+            LOG.debug("RUNTIME LIMIT EXCEEDED WHILE SEARCHING CANDIDATES")
+            break
+        triples, k = local_hdt.document().search_triples_ids(v.s_id, 0, 0)
+        if k > TRIPLE_LIMIT:
+            continue
+        if num_triples + k > limit:
+            LOG.debug("STOPPED SEARCHING CANDIDATES AFTER {} TRIPLES".format(num_triples))
+            break
+        num_triples += k
+        for _, p_id, o_id in triples:
+            if blacklist is None or not blacklist.isBlacklistedId(p_id):
+                next_reached.setdefault(Vertex.fromObjectId(o_id), set()).update(starts)
+    return next_reached, num_triples
+
+
+def find_candidates(forward_paths: List[Path], depth: int, examples: Examples, blacklist: Blacklist = None,
+                    exclude: Set[Vertex] = frozenset(), num_candidates: int = CANDIDATES,
+                    limit: int = CANDIDATE_TRIPLE_LIMIT, end_time: float = math.inf) -> List[Vertex]:
+    # Follows the outgoing links of the end-points of forward_paths for up to depth steps, without building paths.
+    # Every vertex reached this way is scored as if a single explanation connected it to all the examples that reach it,
+    # and the best vertices that are not in exclude are returned. The best scoring vertices are followed first,
+    # so that the most promising candidates are found before limit triples are read.
+    reached: Dict[Vertex, Set[Example]] = {}
+    for path in forward_paths:
+        for v in path.get_frontier():
+            reached.setdefault(v, set()).update(path.get_starting_points_connected_to_endpoint(v))
+    scores: Dict[Vertex, float] = {}
+    num_triples = 0
+    for _ in range(depth):
+        reached, k = _follow(_by_score(reached, examples), blacklist, limit - num_triples, end_time)
+        num_triples += k
+        for o, starts in reached.items():
+            if o not in exclude:
+                scores[o] = max(scores.get(o, 0.0), _fuzzy_f_measure(starts, examples))
+    return heapq.nlargest(num_candidates, scores, key=lambda v: scores[v])
+
+
+def join(forward_paths: List[Path], target: Vertex, levels: List[BackwardLevel], acyclic: bool = False) -> Set[Explanation]:
+    # Forward paths are only extended along the links in levels. The joined paths contain just the end-points
+    # needed for explanations that end in target, so they must not be expanded further.
+    new_explanations: Set[Explanation] = set()
+    for k in range(1, len(levels) + 1):
+        joined: Dict[Path, Path] = dict()
+        frontier: Dict[Path, Set[Vertex]] = {}
+        for path in forward_paths:
+            meets = set(v for v in path.get_frontier() if v in levels[k - 1])
+            if len(meets) > 0:
+                frontier[path] = meets
+        # Extend one step at a time so each end-point has all its starting points before it is extended.
+        for j in reversed(range(k)):
+            next_frontier: Dict[Path, Set[Vertex]] = {}
+            for path, vertices in frontier.items():
+                for m in vertices:
+                    for p, o in levels[j][m]:
+                        new_path = path.extend(joined, m, p, o, acyclic=acyclic)
+                        if new_path is None:
+                            continue
+                        next_frontier.setdefault(new_path, set()).add(o)
+            frontier = next_frontier
+        for path in frontier:
+            new_explanations.add(Explanation(path, target))
+    return new_explanations
@@ -1,14 +1,20 @@
-
 import os
 import logging
-from typing import Optional, Set
+import re
+from typing import Dict, List, Optional, Pattern, Set, Tuple
 
+import hdt
+from . import explanation_evaluation
+from . import local_hdt
+from .example import Example, Examples
 from .knowledge_graph import Predicate
 
 LOG = logging.getLogger('dedalov2.blacklist')
 
 
 class Blacklist:
+    # Lines ending in * blacklist every predicate in a namespace. Lines starting with ^ are regular expressions.
+    # Both are compiled into a set of predicate IDs, so that triples can be skipped before their terms are resolved.
 
     @staticmethod
     def fromFile(filename: Optional[str]) -> 'Blacklist':
@@ -17,19 +23,81 @@ class Blacklist:
             if not os.path.isfile(filename):
                 raise ValueError("{} is not a file!".format(filename))
             with open(filename) as fin:
-                lines = map(lambda line: line.strip(), fin.readline())
-                for line in lines:
-                    try:
-                        bl.addToBlacklist(Predicate.fromString(line))
-                    except ValueError as e:
-                        LOG.warning(e)
+                for line in fin:
+                    bl.addLine(line.strip())
+            bl.compile()
         return bl
 
     def __init__(self):
-        self.blacklisted_items: Set[Predicate] = set()
+        self.blacklisted_ids: Set[int] = set()
+        self.prefixes: List[str] = []
+        self.patterns: List[Pattern] = []
+
+    def addLine(self, line: str) -> None:
+        if len(line) == 0 or line.startswith("#"):
+            return
+        if line.endswith("*"):
+            self.prefixes.append(line[:-1])
+        elif line.startswith("^"):
+            try:
+                self.patterns.append(re.compile(line))
+            except re.error as e:
+                LOG.warning("Invalid pattern {}: {}".format(line, e))
+        else:
+            try:
+                self.addToBlacklist(Predicate.fromString(line))
+            except ValueError as e:
+                LOG.warning(e)
 
     def addToBlacklist(self, item: Predicate) -> None:
-        self.blacklisted_items.add(item)
+        self.blacklisted_ids.add(item.id)
+
+    def compile(self) -> None:
+        # Matches the prefixes and patterns against every predicate in the HDT file once.
+        if len(self.prefixes) == 0 and len(self.patterns) == 0:
+            return
+        doc = local_hdt.document()
+        prefixes = tuple(self.prefixes)
+        num_predicates = doc.nb_predicates
+        num_matched = 0
+        for p_id in range(1, num_predicates + 1):
+            uri = doc.convert_id(p_id, hdt.IdentifierPosition.Predicate)
+            if uri.startswith(prefixes) or any(pattern.match(uri) for pattern in self.patterns):
+                self.blacklisted_ids.add(p_id)
+                num_matched += 1
+        LOG.debug("BLACKLISTED {} OF {} PREDICATES USING {} PREFIXES AND {} PATTERNS".format(
+            num_matched, num_predicates, len(self.prefixes), len(self.patterns)))
+
+    def addUninformative(self, examples: Examples, fanout: float) -> None:
+        # Blacklists predicates that leave the examples with more than fanout links per connected example on average,
+        # if none of the explanations one step along them scores better than an explanation connected to all examples.
+        links: Dict[int, int] = {}
+        connected: Dict[int, Set[Example]] = {}
+        # Number of positive and negative examples linked to each object through each predicate. Triples are unique,
+        # so every example is counted at most once per pair.
+        counts: Dict[Tuple[int, int], List[int]] = {}
+        for e in examples:
+            if not e.vertex.is_subject():
+                continue
+            triples, _ = local_hdt.document().search_triples_ids(e.vertex.s_id, 0, 0)
+            for _, p_id, o_id in triples:
+                links[p_id] = links.get(p_id, 0) + 1
+                connected.setdefault(p_id, set()).add(e)
+                counts.setdefault((p_id, o_id), [0, 0])[0 if e.positive else 1] += 1
+        num_positives = len(examples.positives)
+        best: Dict[int, float] = {}
+        for (p_id, _), (tp, fp) in counts.items():
+            score = explanation_evaluation._fuzzy_f_measure_counts(tp, fp, num_positives - tp)
+            best[p_id] = max(best.get(p_id, 0.0), score)
+        trivial = explanation_evaluation._fuzzy_f_measure_counts(num_positives, len(examples.negatives), 0)
+        for p_id, num_links in links.items():
+            if num_links / len(connected[p_id]) > fanout and best[p_id] <= trivial:
+                LOG.debug("BLACKLISTING UNINFORMATIVE PREDICATE {} LINKS: {} CONNECTED: {} BEST SCORE: {}".format(
+                    Predicate.fromId(p_id), num_links, len(connected[p_id]), best[p_id]))
+                self.blacklisted_ids.add(p_id)
 
     def isBlacklisted(self, p: Predicate) -> bool:
-        return p in self.blacklisted_items
+        return p.id in self.blacklisted_ids
+
+    def isBlacklistedId(self, p_id: int) -> bool:
+        return p_id in self.blacklisted_ids
@@ -0,0 +1,151 @@
+import heapq
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from .example import Example, Examples
+from .explanation import Explanation, Record
+from .explanation_evaluation import _fuzzy_f_measure_counts
+
+LOG = logging.getLogger('dedalov2.combination')
+
+# Number of best explanations that are combined.
+CANDIDATES = 100
+
+
+class Combination:
+    # Explains the examples explained by all (conjunction) or any (disjunction) of its explanations.
+    __slots__ = ("explanations", "conjunctive", "record")
+
+    def __init__(self, explanations: Tuple[Explanation, ...], conjunctive: bool):
+        self.explanations: Tuple[Explanation, ...] = explanations
+        self.conjunctive: bool = conjunctive
+        self.record: Optional[Record] = None
+
+    def explains(self, examples: Examples) -> Set[Example]:
+        roots = [exp.explains(examples) for exp in self.explanations]
+        return set.intersection(*roots) if self.conjunctive else set.union(*roots)
+
+    def __eq__(self, other):
+        return isinstance(other, Combination) and self.conjunctive == other.conjunctive and self.explanations == other.explanations
+
+    def __hash__(self):
+        return hash(self.explanations)*2+int(self.conjunctive)
+
+    def __str__(self):
+        return (" AND " if self.conjunctive else " OR ").join("({})".format(exp) for exp in self.explanations)
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+class Combiner:
+    # Examples are numbered, so that the examples explained by an explanation are a bitset.
+    # Combinations are built from the best explanations by intersecting or joining their bitsets.
+
+    def __init__(self, examples: Examples, size: int = 2, candidates: int = CANDIDATES):
+        self.examples: Examples = examples
+        self.size: int = size
+        self.candidates: int = candidates
+        self.index: Dict[Example, int] = {}
+        for e in examples:
+            self.index.setdefault(e, len(self.index))
+        self.positives: int = self.bitset(examples.positives)
+        self.negatives: int = ((1 << len(self.index)) - 1) & ~self.positives
+        self.num_positives: int = _popcount(self.positives)
+        # Min-heap of (score, -arrival, bitset, explanation). Earlier explanations win ties.
+        self.top: List[Tuple[float, int, int, Explanation]] = []
+        self.arrivals: int = 0
+        self.pruned: int = 0
+
+    def bitset(self, roots: Iterable[Example]) -> int:
+        bits = 0
+        for e in roots:
+            bits |= 1 << self.index[e]
+        return bits
+
+    def add(self, exp: Explanation) -> None:
+        if exp.record is None:
+            return
+        self.arrivals += 1
+        score = exp.record.score
+        if len(self.top) >= self.candidates and score <= self.top[0][0]:
+            return
+        item = (score, -self.arrivals, self.bitset(exp.explains(self.examples)), exp)
+        if len(self.top) < self.candidates:
+            heapq.heappush(self.top, item)
+        else:
+            heapq.heappushpop(self.top, item)
+
+    def combine(self, explanations: Iterator[Explanation], minimum_score: float) -> Iterator[Union[Explanation, Combination]]:
+        # Passes on the given explanations, and yields the combinations that score better than each of their
+        # explanations once the search ends.
+        for exp in explanations:
+            self.add(exp)
+            yield exp
+        for combination in self.combinations(minimum_score):
+            yield combination
+
+    def score(self, bits: int) -> float:
+        tp = _popcount(bits & self.positives)
+        return _fuzzy_f_measure_counts(tp, _popcount(bits & self.negatives), self.num_positives - tp)
+
+    def upper_bound(self, bits: int, rest: int, conjunctive: bool) -> float:
+        # Adding explanations to a conjunction can only remove examples, and adding them to a disjunction can only add examples.
+        # rest is the intersection (conjunction) or union (disjunction) of all explanations that can still be added.
+        if conjunctive:
+            tp = _popcount(bits & self.positives)
+            fp = _popcount(bits & rest & self.negatives)
+        else:
+            tp = _popcount((bits | rest) & self.positives)
+            fp = _popcount(bits & self.negatives)
+        return _fuzzy_f_measure_counts(tp, fp, self.num_positives - tp)
+
+    def combinations(self, minimum_score: float) -> List[Combination]:
+        # Explanations that explain the same examples are interchangeable, so only the best of them is combined.
+        candidates: Dict[int, Tuple[float, Explanation]] = {}
+        for score, _, bits, exp in sorted(self.top, reverse=True):
+            candidates.setdefault(bits, (score, exp))
+        cands = [(bits, score, exp) for bits, (score, exp) in candidates.items()]
+        # The smallest combination is kept for every set of explained examples.
+        found: Dict[int, Tuple[float, Tuple[Explanation, ...], bool]] = {}
+        for conjunctive in (True, False):
+            rest = [self.positives | self.negatives if conjunctive else 0]
+            for bits, _, _ in reversed(cands):
+                rest.append(rest[-1] & bits if conjunctive else rest[-1] | bits)
+            rest.reverse()
+            for i, (bits, score, exp) in enumerate(cands):
+                self._extend(cands, rest, i + 1, bits, (exp,), score, conjunctive, minimum_score, found)
+        res = []
+        for bits, (score, members, conjunctive) in sorted(found.items(), key=lambda item: (-item[1][0], len(item[1][1]))):
+            combination = Combination(members, conjunctive)
+            tp = _popcount(bits & self.positives)
+            combination.record = Record(combination, score, num_examples=len(self.index), num_positives=self.num_positives,
+                                        num_connected_positives=tp, num_connected_negatives=_popcount(bits & self.negatives))
+            res.append(combination)
+        LOG.debug("COMBINED {} EXPLANATIONS INTO {} COMBINATIONS. PRUNED {}".format(len(cands), len(res), self.pruned))
+        return res
+
+    def _extend(self, cands: List[Tuple[int, float, Explanation]], rest: List[int], start: int, bits: int,
+                members: Tuple[Explanation, ...], best_member: float, conjunctive: bool, minimum_score: float,
+                found: Dict[int, Tuple[float, Tuple[Explanation, ...], bool]]) -> None:
+        if len(members) >= self.size:
+            return
+        upper_bound = self.upper_bound(bits, rest[start], conjunctive)
+        if upper_bound <= best_member or upper_bound < minimum_score:
+            self.pruned += 1
+            return
+        for i in range(start, len(cands)):
+            c_bits, c_score, c_exp = cands[i]
+            new_bits = bits & c_bits if conjunctive else bits | c_bits
+            if new_bits == bits or new_bits == c_bits:
+                # Same examples as without one of the explanations.
+                continue
+            new_members = members + (c_exp,)
+            new_best = max(best_member, c_score)
+            score = self.score(new_bits)
+            if score > new_best and score >= minimum_score:
+                previous = found.get(new_bits)
+                if previous is None or len(previous[1]) > len(new_members):
+                    found[new_bits] = (score, new_members, conjunctive)
+            self._extend(cands, rest, i + 1, new_bits, new_members, new_best, conjunctive, minimum_score, found)
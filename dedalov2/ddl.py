@@ -7,23 +7,37 @@ import logging
 import math
 import os
 import time
-from typing import Dict, Collection, Iterator, Optional, Set, Tuple
-
-import psutil
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
+from . import backward
+from . import combination
 from . import explanation_evaluation
+from . import knowledge_graph
 from . import local_hdt
 from . import path_evaluation
 from . import path_pruner
+from . import pipeline
+from . import result_cache
+from . import sampling
 from . import urishortener
+from .adjacency import AdjacencyCache
 from .blacklist import Blacklist
+from .distributed import WorkerPool
 from .example import Examples
 from .explanation import Explanation
 from .knowledge_graph import Predicate, Vertex
+from .lazy_negatives import LazyNegatives
+from .memory_governor import MemoryGovernor
 from .memory_profiler import MemoryProfiler, profiler
 from .path import Path
+from .path_equivalence import PathGroups
 from .path_evaluation import SearchHeuristic, HEURISTIC_NAMES
 from .path_pruner import PathPruner, PATH_PRUNER_NAMES
+from .priors import Priors
+from .result_cache import Recorder, ResultCache
+
+if TYPE_CHECKING:
+    import psutil
 
 
 def strict_handler(exception):
@@ -40,7 +54,13 @@ def print_examples(examples: Examples) -> None:
         LOG.debug(e)
 
 
-def mem_limit_exceeded(process: psutil.Process, memlimit: float) -> Tuple[bool, float]:
+def current_process() -> 'psutil.Process':
+    # psutil is imported when the search starts, not when this module is loaded.
+    import psutil
+    return psutil.Process(os.getpid())
+
+
+def mem_limit_exceeded(process: 'psutil.Process', memlimit: float) -> Tuple[bool, float]:
     membytes = process.memory_info().rss
     if membytes >= memlimit:
         gc.collect()
@@ -50,15 +70,21 @@ def mem_limit_exceeded(process: psutil.Process, memlimit: float) -> Tuple[bool,
     return (False, membytes)
 
 
-def explain(hdt_file: str, example_file: str, heuristic: str = "entropy", groupid: int = None, prefix: str = None,
+def explain(hdt_file: Union[str, List[str]], example_file: str, heuristic: str = "entropy", groupid: int = None, prefix: str = None,
             blacklist: str = None, truncate: int = 0, balance: bool = True, prune: str = "gle",
             mem_profile: bool = False, runtime: float = math.inf, rounds: float = math.inf,
-            complete: int = 0, minimum_score: float = math.inf, memlimit: float = math.inf) -> Iterator[Explanation]:
+            complete: int = 0, minimum_score: float = math.inf, memlimit: float = math.inf, beam: int = 1,
+            bidirectional: int = 0, collapse: bool = False, soft_memlimit: float = math.inf, readers: int = 0,
+            sample: int = 0, lazy_negatives: bool = False, cache: str = None, cache_size: int = 2**30,
+            acyclic: bool = False, mmap: bool = False, auto_blacklist: float = 0, priors: str = None,
+            workers: List[str] = None, combine: int = 0, combine_candidates: int = combination.CANDIDATES,
+            adjacency_cache: float = 0) -> Iterator[Union[Explanation, combination.Combination]]:
     """Explain why a group of URIs belong together using Semantic Web technology.
     
     :param hdt_file: The location of the HDT file to search for explanations. Instead of traversing the LOD-cloud, Dedadov2 offers increased performance in \
-        exchange for using a preconstructed file containing the linked data. HDT is a space-efficiant storage format for linked data.
-    :type hdt_file: str
+        exchange for using a preconstructed file containing the linked data. HDT is a space-efficiant storage format for linked data. \
+        Pass a list of HDT files to search them together. Terms with the same URI are the same vertex in all files.
+    :type hdt_file: str or List[str]
     :param example_file: The location of the text file with input examples and their groups.
     :type example_file: str
     :param heuristic: The search heuristic that determines which path should be explored next, defaults to "entropy"
@@ -67,7 +93,8 @@ def explain(hdt_file: str, example_file: str, heuristic: str = "entropy", groupi
     :type groupid: int, optional
     :param prefix: The location of a tsv-file with URI prefixes. This makes printed URIs easier to read, defaults to None
     :type prefix: str, optional
-    :param blacklist: The location of a text file with predicate URIs (one per line) that Dedalov2 must ignore, defaults to None
+    :param blacklist: The location of a text file with predicate URIs (one per line) that Dedalov2 must ignore. \
+        Lines ending in * ignore all predicates that start with the given namespace. Lines starting with ^ are regular expressions, defaults to None
     :type blacklist: str, optional
     :param truncate: If this value is larger than 0, both the number of positive examples (URIs from the given group id) and the number of negative examples \
         (URIs from all other groups) are truncated to this amount, defaults to 0
@@ -80,142 +107,564 @@ def explain(hdt_file: str, example_file: str, heuristic: str = "entropy", groupi
     :type mem_profile: bool, optional
     :param runtime: The mamimum allowed runtime. Stop searching after this time, defaults to math.inf
     :type runtime: float, optional
-    :param rounds: Stop searching after this number of rounds. Every round, one path is explored, defaults to math.inf
+    :param rounds: Stop searching after this number of rounds. Every round, up to ``beam`` paths are explored. \
+        During complete search, every round explores all paths of the same length, defaults to math.inf
     :type rounds: float, optional
     :param complete: If larger than 0, stop searching after all explanations with the given path length have been found. \
-        an be used to implement complete search to limited depth, defaults to 0
+        Can be used to implement complete search to limited depth. Paths are explored breadth-first, one path length per round, \
+        and the search heuristic is not used, defaults to 0
     :type complete: int, optional
     :param minimum_score: If equal or greater to zero, only return explanations with a score greater or equal to the given value, defaults to -1
     :type minimum_score: float, optional
-    :param memlimit: Stop searching if the program uses more than the given amount of memory in bytes. Can help prevent MemoryErrors, defaults to math.inf
+    :param memlimit: Stop searching if the program uses more than the given amount of memory in bytes. Can help prevent MemoryErrors. \
+        Use soft_memlimit to limit memory usage without stopping the search, defaults to math.inf
     :type memlimit: float, optional
-    :return: All explanations that meet the given requirements
-    :rtype: Iterator[Explanation]
+    :param bidirectional: If larger than 0, find explanations up to the given path length by searching forward from the examples \
+        for half of the length and backward from the most promising vertices beyond the forward search. The forward search \
+        takes one round per step, and the backward search one more round, defaults to 0
+    :type bidirectional: int, optional
+    :param soft_memlimit: If the estimated size of the stored paths exceeds the given amount of bytes, drop the paths that are least \
+        likely to yield good explanations until the estimate is well below this limit. Unlike memlimit, this does not stop the search, defaults to math.inf
+    :type soft_memlimit: float, optional
+    :param readers: If larger than 0, the given number of threads read triples from the HDT file while the main thread \
+        updates the paths. With more than one reader, the order in which paths are found can differ between runs, defaults to 0
+    :type readers: int, optional
+    :param beam: The number of paths explored per round. The best ``beam`` unpruned paths are selected by the search heuristic \
+        and expanded together, defaults to 1
+    :type beam: int, optional
+    :param collapse: If set to True, paths found in the same round that connect the same examples to the same end-points are only \
+        explored once. Their explanations list the other paths as alternatives, defaults to False
+    :type collapse: bool, optional
+    :param sample: If larger than 0 and smaller than the number of examples, search using a stratified sample of this many examples. \
+        Explanations whose score may reach minimum_score according to the sample are checked against all examples before they are \
+        returned. Explanations that score worse on the sample than the best explanation found so far, with 95% confidence, are not \
+        checked and not returned, even if minimum_score is lower. This trades accuracy for speed on large example sets, defaults to 0
+    :type sample: int, optional
+    :param lazy_negatives: If set to True, paths are explored from the positive examples only. Negative examples are traced along a path \
+        once one of its explanations could reach minimum_score. This saves work when minimum_score is high, but only finds explanations \
+        connected to at least one positive example, defaults to False
+    :type lazy_negatives: bool, optional
+    :param cache: The location of a directory in which search results are cached. Runs on the same HDT file, examples, and search parameters \
+        replay the cached explanations instead of searching again, defaults to None
+    :type cache: str, optional
+    :param cache_size: The maximum size of the cache directory in bytes. The least recently used entries are removed first, defaults to 2**30
+    :type cache_size: int, optional
+    :param acyclic: If set to True, links that lead back to an example or to a vertex the example already reached through a shorter part \
+        of the path are not followed. This reduces the number of paths on densely interlinked graphs, defaults to False
+    :type acyclic: bool, optional
+    :param mmap: The HDT file and its index are always mapped into memory. If set to True, check the index before the search starts, \
+        and report progress while a missing or empty index is built. The index is built once and stored next to the HDT file. Pages of \
+        the mapped file count toward memlimit once they are read, defaults to False
+    :type mmap: bool, optional
+    :param auto_blacklist: If larger than 0, also ignore predicates that leave the examples with more than this many links per example on average, \
+        unless one of the explanations one step along them scores better than an explanation connected to all examples. Such predicates \
+        add many paths but no information, defaults to 0
+    :type auto_blacklist: float, optional
+    :param priors: The location of a file with the best scores found per predicate sequence in previous runs. During the first rounds, \
+        paths along sequences that led to the best explanations get a bonus on their heuristic score. The best scores found by this run \
+        are added to the file once the search ends, unless it fails or is stopped early. Results replayed from the cache are not added, defaults to None
+    :type priors: str, optional
+    :param workers: Addresses (host:port) of worker processes that read triples for this search. Every worker must serve the same HDT file. \
+        Start a worker with ``python -m dedalov2.distributed --hdt-file <file> --port <port>``. The paths are still kept and scored by this process. \
+        Shards of failed workers are taken over by the other workers, or read locally if no worker is left. Triples arrive in the order \
+        the workers return them, so with order-dependent pruners such as gle the explanations can differ between runs, defaults to None
+    :type workers: List[str], optional
+    :param combine: Maximum number of explanations per combined explanation. When the search ends, the best explanations are combined \
+        into conjunctions (examples explained by all of them) and disjunctions (examples explained by any of them). Only combinations that \
+        score better than each of their explanations are returned, best first, as Combination objects. These have a record and the \
+        combined explanations, but no path or value. 0 disables combining, defaults to 0
+    :type combine: int, optional
+    :param combine_candidates: Number of best explanations that are combined, defaults to 100
+    :type combine_candidates: int, optional
+    :param adjacency_cache: Maximum size in bytes of a cache with the outgoing links of recently expanded vertices. Vertices reached by \
+        many paths, such as popular types or categories, are then read from the HDT file only once. 0 disables the cache, defaults to 0
+    :type adjacency_cache: float, optional
+    :return: All explanations that meet the given requirements, followed by their combinations if combine is larger than 1
+    :rtype: Iterator[Union[Explanation, Combination]]
     """
-    local_hdt.init(hdt_file)
-
+    hdt_file = _init_hdt(hdt_file, mmap)
     urishortener.setPrefixMapFromFile(prefix)
     bl = Blacklist.fromFile(blacklist)
     heur: SearchHeuristic = HEURISTIC_NAMES[heuristic]
+    prior_store = Priors(priors) if priors is not None else None
+    if prior_store is not None:
+        heur = path_evaluation.PriorHeuristic(heur, prior_store.prefix_scores())
 
     examples = Examples.fromCSV(example_file, groupid=groupid, truncate=truncate, balance=balance)
     print_examples(examples)
+    if auto_blacklist > 0:
+        bl.addUninformative(examples, auto_blacklist)
 
-    pruner = PATH_PRUNER_NAMES[prune](explanation_evaluation.max_fuzzy_f_measure, examples)
+    search_examples, upper_bound = _sample(examples, sample)
+    pruner = PATH_PRUNER_NAMES[prune](upper_bound, search_examples)
     mp: MemoryProfiler = profiler(mem_profile)
-    for explanation in _explain(examples, pruner, heuristic=heur, mp=mp, blacklist=bl, runtime=runtime, rounds=rounds,
-                                complete=complete, minimum_score=minimum_score, memlimit=memlimit):
-        yield explanation
+    if cache is not None and not isinstance(hdt_file, str):
+        # Cached explanations store HDT IDs, which are assigned anew whenever multiple files are searched together.
+        LOG.warning("Results are not cached when searching multiple HDT files.")
+        cache = None
+    recorder = Recorder() if cache is not None else None
+    pool = _worker_pool(workers, hdt_file)
+    search = _explain(search_examples, pruner, heuristic=heur, mp=mp, blacklist=bl, runtime=runtime, rounds=rounds,
+                      complete=complete, minimum_score=minimum_score if search_examples is examples else -1, memlimit=memlimit,
+                      beam=beam, bidirectional=bidirectional, collapse=collapse, soft_memlimit=soft_memlimit,
+                      readers=readers, lazy_negatives=lazy_negatives, recorder=recorder, acyclic=acyclic, workers=pool,
+                      adjacency=AdjacencyCache(adjacency_cache) if adjacency_cache > 0 else None)
+    results: Optional[ResultCache] = None
+    key = ""
+    if recorder is not None:
+        results = ResultCache(cache, cache_size)
+        key = results.key(hdt_file, examples, heuristic=heuristic, prune=prune, complete=complete, beam=beam, bidirectional=bidirectional,
+                          collapse=collapse, minimum_score=minimum_score, soft_memlimit=soft_memlimit, sample=sample,
+                          lazy_negatives=lazy_negatives, acyclic=acyclic, auto_blacklist=auto_blacklist,
+                          priors=priors is not None,
+                          blacklist=result_cache.file_fingerprint(blacklist), readers=readers, workers=pool is not None)
+    # Multiple readers and workers deliver triples in varying order, and the priors file changes with every run,
+    # so a repeated search can find other explanations.
+    search = _wrap(search, examples, search_examples, minimum_score, acyclic=acyclic, prior_store=prior_store, results=results,
+                   key=key, recorder=recorder, rounds=rounds, runtime=runtime,
+                   deterministic=readers <= 1 and pool is None and priors is None,
+                   combine=combine, combine_candidates=combine_candidates)
+    try:
+        for explanation in search:
+            yield explanation
+    finally:
+        # Also when a cached result is replayed without starting the search.
+        if pool is not None:
+            pool.close()
+
+
+def _init_hdt(hdt_file: Union[str, List[str]], mmap: bool = False) -> Union[str, List[str]]:
+    if not isinstance(hdt_file, str) and len(hdt_file) == 1:
+        # The command line always passes a list.
+        hdt_file = hdt_file[0]
+    local_hdt.init(hdt_file, mmap=mmap)
+    knowledge_graph.clear_interned()
+    return hdt_file
+
+
+def _sample(examples: Examples, sample: int) -> Tuple[Examples, Callable[[Path, Examples], float]]:
+    # Returns the examples to search with, and the upper bound the pruner uses for them.
+    if 0 < sample < len(examples):
+        search_examples = examples.sample(sample)
+        LOG.debug("SEARCHING WITH {} OF {} EXAMPLES".format(len(search_examples), len(examples)))
+        return search_examples, sampling.max_fuzzy_f_measure_ucb(examples)
+    return examples, explanation_evaluation.max_fuzzy_f_measure
+
+
+def _worker_pool(workers: Optional[List[str]], hdt_file: Union[str, List[str]]) -> Optional[WorkerPool]:
+    if workers is None or len(workers) == 0:
+        return None
+    if not isinstance(hdt_file, str) and len(hdt_file) > 1:
+        raise ValueError("Workers can only be used with a single HDT file.")
+    return WorkerPool(workers, result_cache.hdt_fingerprint(hdt_file))
+
+
+def _wrap(search: Iterator[Explanation], examples: Examples, search_examples: Examples, minimum_score: float,
+          acyclic: bool = False, prior_store: Priors = None, results: ResultCache = None, key: str = "",
+          recorder: Recorder = None, rounds: float = math.inf, runtime: float = math.inf, deterministic: bool = True,
+          combine: int = 0, combine_candidates: int = combination.CANDIDATES) -> Iterator[Union[Explanation, combination.Combination]]:
+    # Wraps the search in the steps that act on the explanations it finds. Explanations found with a sample are verified
+    # before they are recorded as priors or cached, and the cache replays them before they are combined.
+    if search_examples is not examples:
+        search = sampling.Verifier(examples, search_examples, acyclic=acyclic).verify(search, minimum_score)
+    if prior_store is not None:
+        search = prior_store.record(search)
+    if results is not None and recorder is not None:
+        search = _cached(search, results, key, recorder, examples, rounds=rounds, runtime=runtime, deterministic=deterministic)
+    if combine > 1:
+        return combination.Combiner(examples, size=combine, candidates=combine_candidates).combine(search, minimum_score)
+    return search
+
+
+def _cached(search: Iterator[Explanation], results: ResultCache, key: str, recorder: Recorder, examples: Examples,
+            rounds: float = math.inf, runtime: float = math.inf, deterministic: bool = True) -> Iterator[Explanation]:
+    entry = results.get(key)
+    cached_rounds = 0
+    if entry is not None and (deterministic or entry.covers(rounds, runtime)):
+        for explanation in entry.replay(examples, rounds=rounds, runtime=runtime):
+            yield explanation
+        if entry.covers(rounds, runtime):
+            return
+        # The search starts from the beginning again. It finds the same explanations in the cached rounds,
+        # so these are not reported twice.
+        cached_rounds = entry.rounds
+        LOG.debug("SEARCHING AGAIN AFTER {} CACHED ROUNDS".format(cached_rounds))
+    elif entry is not None:
+        LOG.debug("SEARCHING AGAIN WITHOUT {} CACHED ROUNDS".format(entry.rounds))
+
+    try:
+        for explanation in search:
+            recorder.add(explanation)
+            if recorder.current_round > cached_rounds:
+                yield explanation
+    finally:
+        if recorder.exhausted or recorder.rounds > (entry.rounds if entry is not None else 0):
+            results.put(key, recorder)
 
 
 def _explain(examples: Examples, pruner: PathPruner, heuristic: SearchHeuristic = path_evaluation.entropy,
              mp: MemoryProfiler = profiler(False), runtime: float = math.inf,
              rounds: float = math.inf, blacklist: Blacklist = None, complete: int = 0,
-             minimum_score: float = -1, memlimit: float = math.inf) -> Iterator[Explanation]:
-    nodes: Collection[Vertex] = [example.vertex for example in examples]
-
+             minimum_score: float = -1, memlimit: float = math.inf, beam: int = 1, bidirectional: int = 0,
+             collapse: bool = False, soft_memlimit: float = math.inf, readers: int = 0, lazy_negatives: bool = False,
+             recorder: Recorder = None, acyclic: bool = False, workers: WorkerPool = None,
+             adjacency: AdjacencyCache = None) -> Iterator[Explanation]:
+    negatives: Optional[LazyNegatives] = LazyNegatives(examples, acyclic=acyclic) if lazy_negatives else None
+    if negatives is not None and collapse:
+        LOG.warning("Paths are not collapsed when negative examples are traced lazily.")
+        collapse = False
+    groups: Optional[PathGroups] = PathGroups() if collapse else None
+    governor = MemoryGovernor(soft_memlimit)
+    if bidirectional > 0:
+        for exp in _explain_bidirectional(examples, pruner, mp=mp, runtime=runtime, blacklist=blacklist, depth=bidirectional,
+                                          minimum_score=minimum_score, memlimit=memlimit, groups=groups, governor=governor,
+                                          heuristic=heuristic, rounds=rounds,
+                                          readers=readers, negatives=negatives, recorder=recorder, acyclic=acyclic,
+                                          workers=workers, adjacency=adjacency):
+            yield exp
+        return
+    if complete > 0:
+        for exp in _explain_complete(examples, pruner, heuristic=heuristic, mp=mp, runtime=runtime, rounds=rounds, blacklist=blacklist,
+                                     complete=complete, minimum_score=minimum_score, memlimit=memlimit, groups=groups,
+                                     governor=governor, readers=readers, negatives=negatives, recorder=recorder,
+                                     acyclic=acyclic, workers=workers, adjacency=adjacency):
+            yield exp
+        return
+
+    for exp in _explain_best_first(examples, pruner, heuristic=heuristic, mp=mp, runtime=runtime, rounds=rounds, blacklist=blacklist,
+                                   minimum_score=minimum_score, memlimit=memlimit, beam=beam, groups=groups, governor=governor,
+                                   readers=readers, negatives=negatives, recorder=recorder, acyclic=acyclic, workers=workers,
+                                   adjacency=adjacency):
+        yield exp
+
+
+def _explain_best_first(examples: Examples, pruner: PathPruner, heuristic: SearchHeuristic = path_evaluation.entropy,
+                        mp: MemoryProfiler = profiler(False), runtime: float = math.inf,
+                        rounds: float = math.inf, blacklist: Blacklist = None,
+                        minimum_score: float = -1, memlimit: float = math.inf, beam: int = 1, groups: PathGroups = None,
+                        governor: MemoryGovernor = MemoryGovernor(), readers: int = 0, negatives: LazyNegatives = None,
+                        recorder: Recorder = None, acyclic: bool = False, workers: WorkerPool = None,
+                        adjacency: AdjacencyCache = None) -> Iterator[Explanation]:
     paths: Dict[Path, Path] = dict()
     explanations: int = 0
 
-    best_path: Optional[Path] = Path.from_examples(examples)
+    best_paths: List[Path] = [Path.from_examples(examples) if negatives is None else negatives.root()]
+    nodes: Dict[Vertex, List[Path]] = frontier(best_paths)
     end_time = time.time() + runtime
     round_number = 1
-    shortest_path: int = 0
-    process = psutil.Process(os.getpid())
+    process = current_process()
+    exceeded = False
     try:
-        while best_path is not None and time.time() < end_time and round_number <= rounds and (complete == 0 or shortest_path < complete):
-            mp()
-            new_explanations: Set[Explanation] = set()
-            LOG.debug("ROUND: {}".format(round_number))
-            LOG.debug("PATH: {} NUMVERTICES: {}".format(best_path, len(nodes)))
+        while len(best_paths) > 0 and time.time() < end_time and round_number <= rounds:
+            _start_round(round_number, recorder, mp)
+            for best_path in best_paths:
+                LOG.debug("PATH: {}".format(best_path))
+            LOG.debug("NUMPATHS: {} NUMVERTICES: {}".format(len(best_paths), len(nodes)))
             round_start = time.time()
-            for i, node in enumerate(nodes):
-                _print_progress(len(nodes), i, round_number)
-                e = follow_outgoing_links(node, best_path, paths, end_time, examples, blacklist=blacklist)
-                new_explanations.update(e)
-                explanations += len(e)
-                curtime = time.time()
-                if curtime > end_time:
-                    LOG.debug("RUNTIME LIMIT EXCEEDED: {} > {}. EXITING".format(curtime, end_time))
-                    break
-            if len(new_explanations) > 0:
-                explanation_evaluation.find_best_explanation(new_explanations, examples)
-                for exp in new_explanations:
-                    if exp.record is not None and exp.record.score >= minimum_score:
-                        yield exp
-            paths.pop(best_path, None)
-
-            round_duration = time.time() - round_start
-            exceeded, num_bytes = mem_limit_exceeded(process, memlimit)
-            LOG.debug("ROUND: {} TIME: {} MEMBYTES: {}".format(round_number, round_duration, num_bytes))
-            mp()
+            new_explanations = expand(nodes, paths, end_time, examples, round_number, blacklist=blacklist, groups=groups,
+                                      readers=readers, acyclic=acyclic, workers=workers, adjacency=adjacency)
+            explanations += len(new_explanations)
+            for exp in evaluate_explanations(new_explanations, examples, minimum_score, negatives=negatives):
+                yield exp
+            for best_path in best_paths:
+                paths.pop(best_path, None)
+            exceeded, _ = _end_round(round_number, round_start, end_time, paths, heuristic, examples, governor,
+                                     process, memlimit, recorder, mp)
             round_number += 1
-            if exceeded:
-                LOG.debug("MEMLIMIT EXCEEDED: {} > {}. EXITING".format(num_bytes, memlimit))
+            if exceeded or len(paths) == 0:
                 break
+            best_paths = path_evaluation.find_best_paths(heuristic, paths, examples, pruner, beam)
+            nodes = frontier(best_paths)
+    except KeyboardInterrupt as ki:
+        raise ki
+    _finish(recorder, not exceeded and time.time() < end_time and round_number <= rounds, explanations)
+
+
+def _explain_complete(examples: Examples, pruner: PathPruner, heuristic: SearchHeuristic = path_evaluation.entropy,
+                      mp: MemoryProfiler = profiler(False), runtime: float = math.inf,
+                      rounds: float = math.inf, blacklist: Blacklist = None, complete: int = 1,
+                      minimum_score: float = -1, memlimit: float = math.inf, groups: PathGroups = None,
+                      governor: MemoryGovernor = MemoryGovernor(), readers: int = 0, negatives: LazyNegatives = None,
+                      recorder: Recorder = None, last_level: List[Path] = None, acyclic: bool = False,
+                      workers: WorkerPool = None, adjacency: AdjacencyCache = None) -> Iterator[Explanation]:
+    # Level-synchronous breadth-first search. Round L expands all paths of length L-1 together,
+    # so every end-point reached by multiple paths of the same length is fetched only once.
+    explanations: int = 0
 
-            if len(paths) > 0:
-                if complete > 0:
-                    shortest_path = min(map(lambda x: len(x), paths))
-                best_path = path_evaluation.find_best_path(heuristic, paths, examples, pruner, max_length=complete - 1)
-                if best_path is None:
-                    break
-                nodes = set(v for v in best_path.get_end_points() if v.is_subject())
-            else:
+    level_paths: List[Path] = [Path.from_examples(examples) if negatives is None else negatives.root()]
+    end_time = time.time() + runtime
+    round_number = 1
+    process = current_process()
+    exceeded = False
+    try:
+        while len(level_paths) > 0 and round_number <= complete and time.time() < end_time and round_number <= rounds:
+            _start_round(round_number, recorder, mp)
+            nodes = frontier(level_paths)
+            LOG.debug("PATHLENGTH: {} NUMPATHS: {} NUMVERTICES: {}".format(round_number - 1, len(level_paths), len(nodes)))
+            round_start = time.time()
+            paths: Dict[Path, Path] = dict()
+            new_explanations = expand(nodes, paths, end_time, examples, round_number, blacklist=blacklist, groups=groups,
+                                      readers=readers, acyclic=acyclic, workers=workers, adjacency=adjacency)
+            explanations += len(new_explanations)
+            for exp in evaluate_explanations(new_explanations, examples, minimum_score, negatives=negatives):
+                yield exp
+            exceeded, evicted = _end_round(round_number, round_start, end_time, paths, heuristic, examples, governor,
+                                           process, memlimit, recorder, mp)
+            if evicted > 0:
+                LOG.warning("Paths were evicted. The search is no longer complete.")
+            round_number += 1
+            if exceeded:
                 break
+
+            if round_number <= complete:
+                level_paths = [path for path in paths if not pruner(path)]
+                LOG.debug("PRUNED {} PATHS".format(len(paths) - len(level_paths)))
+            elif last_level is not None:
+                last_level.extend(path for path in paths if not pruner(path))
     except KeyboardInterrupt as ki:
         raise ki
+    _finish(recorder, not exceeded and time.time() < end_time and round_number <= rounds, explanations)
+
+
+def _start_round(round_number: int, recorder: Optional[Recorder], mp: MemoryProfiler) -> None:
+    mp()
+    if recorder is not None:
+        recorder.start_round(round_number)
+    LOG.debug("ROUND: {}".format(round_number))
+
+
+def _end_round(round_number: int, round_start: float, end_time: float, paths: Dict[Path, Path], heuristic: SearchHeuristic,
+               examples: Examples, governor: MemoryGovernor, process: 'psutil.Process', memlimit: float,
+               recorder: Optional[Recorder], mp: MemoryProfiler) -> Tuple[bool, int]:
+    # Returns whether the memory limit is exceeded, and the number of paths the governor evicted.
+    if recorder is not None and time.time() < end_time:
+        recorder.end_round(round_number)
+    if isinstance(heuristic, path_evaluation.PriorHeuristic):
+        heuristic.end_round()
+    evicted = governor(paths, heuristic, examples)
+    round_duration = time.time() - round_start
+    exceeded, num_bytes = mem_limit_exceeded(process, memlimit)
+    LOG.debug("ROUND: {} TIME: {} MEMBYTES: {}".format(round_number, round_duration, num_bytes))
+    mp()
+    if exceeded:
+        LOG.debug("MEMLIMIT EXCEEDED: {} > {}. EXITING".format(num_bytes, memlimit))
+    return exceeded, evicted
+
+
+def _finish(recorder: Optional[Recorder], exhausted: bool, explanations: int) -> None:
+    if recorder is not None:
+        recorder.finish(exhausted)
     LOG.debug("Exiting...")
     LOG.debug("Num explanations created: {}".format(explanations))
 
 
+def _explain_bidirectional(examples: Examples, pruner: PathPruner, mp: MemoryProfiler = profiler(False), runtime: float = math.inf,
+                           heuristic: SearchHeuristic = path_evaluation.entropy, rounds: float = math.inf,
+                           blacklist: Blacklist = None, depth: int = 3, minimum_score: float = -1,
+                           memlimit: float = math.inf, groups: PathGroups = None,
+                           governor: MemoryGovernor = MemoryGovernor(), readers: int = 0, negatives: LazyNegatives = None,
+                           recorder: Recorder = None, acyclic: bool = False, workers: WorkerPool = None,
+                           adjacency: AdjacencyCache = None) -> Iterator[Explanation]:
+    # Search forward from the examples for half the depth, then search backward from the most promising vertices
+    # beyond the forward search, and join both halves on the vertices where they meet.
+    # The forward search counts as one round per level, and the backward search as one more round.
+    forward_depth = (depth + 1) // 2
+    end_time = time.time() + runtime
+    last_level: List[Path] = []
+    values: Set[Vertex] = set()
+    for exp in _explain_complete(examples, pruner, heuristic=heuristic, mp=mp, runtime=runtime, rounds=rounds,
+                                 blacklist=blacklist, complete=forward_depth,
+                                 memlimit=memlimit, groups=groups, governor=governor, readers=readers,
+                                 negatives=negatives, recorder=recorder, last_level=last_level, acyclic=acyclic,
+                                 workers=workers, adjacency=adjacency):
+        values.add(exp.value)
+        if exp.record.score >= minimum_score:
+            yield exp
+    if rounds <= forward_depth or time.time() > end_time:
+        return
+    if recorder is not None:
+        recorder.start_round(forward_depth + 1)
+        recorder.finish(False)
+
+    # Values of forward explanations are already explained. Explanations longer than the forward search end further away.
+    candidates = backward.find_candidates(last_level, depth - forward_depth, examples, blacklist=blacklist, exclude=values,
+                                          end_time=end_time)
+    LOG.debug("JOINING {} FORWARD PATHS WITH {} CANDIDATES".format(len(last_level), len(candidates)))
+    for target in candidates:
+        if time.time() > end_time:
+            LOG.debug("RUNTIME LIMIT EXCEEDED. EXITING")
+            break
+        levels = backward.expand_backward(target, depth - forward_depth, blacklist=blacklist)
+        if levels is None:
+            continue
+        new_explanations = backward.join(last_level, target, levels, acyclic=acyclic)
+        LOG.debug("CANDIDATE: {} JOINED EXPLANATIONS: {}".format(target, len(new_explanations)))
+        for exp in evaluate_explanations(new_explanations, examples, minimum_score, negatives=negatives):
+            yield exp
+    if recorder is not None and time.time() < end_time:
+        recorder.end_round(forward_depth + 1)
+        recorder.finish(True)
+
+
+def expand(nodes: Dict[Vertex, List[Path]], paths: Dict[Path, Path], end_time: float, examples: Examples,
+           round_number: int, blacklist: Blacklist = None, groups: PathGroups = None, readers: int = 0,
+           acyclic: bool = False, workers: WorkerPool = None, adjacency: AdjacencyCache = None) -> Set[Explanation]:
+    if readers > 0 or workers is not None:
+        new_explanations = expand_pipelined(nodes, paths, end_time, blacklist=blacklist, readers=readers, acyclic=acyclic,
+                                            workers=workers, adjacency=adjacency)
+    else:
+        new_explanations = set()
+        for i, (node, node_paths) in enumerate(nodes.items()):
+            _print_progress(len(nodes), i, round_number)
+            e = follow_outgoing_links(node, node_paths, paths, end_time, examples, blacklist=blacklist, acyclic=acyclic,
+                                      adjacency=adjacency)
+            new_explanations.update(e)
+            curtime = time.time()
+            if curtime > end_time:
+                LOG.debug("RUNTIME LIMIT EXCEEDED: {} > {}. EXITING".format(curtime, end_time))
+                break
+    if adjacency is not None:
+        adjacency.log_stats()
+    if groups is not None:
+        # Explanations of collapsed paths are reported as alternatives of their group's explanations.
+        merged = groups.collapse(new_explanations, paths)
+        new_explanations = set(exp for exp in new_explanations if exp.path not in merged)
+    return new_explanations
+
+
+def expand_pipelined(nodes: Dict[Vertex, List[Path]], paths: Dict[Path, Path], end_time: float,
+                     blacklist: Blacklist = None, readers: int = 1, acyclic: bool = False,
+                     workers: WorkerPool = None, adjacency: AdjacencyCache = None) -> Set[Explanation]:
+    # Reader threads, or remote workers, fetch triples from the HDT file while this thread updates the paths.
+    new_explanations: Set[Explanation] = set()
+    num_triples = 0
+    if workers is not None:
+        buffers = workers.outgoing_triples(list(nodes), adjacency=adjacency)
+    else:
+        buffers = pipeline.outgoing_triples(list(nodes), readers=readers, adjacency=adjacency)
+    for buf in buffers:
+        ids = buf.ids
+        for i in range(0, 3 * buf.size, 3):
+            s = Vertex.fromSubjectId(ids[i])
+            follow_link(s, ids[i + 1], ids[i + 2], nodes[s], paths, new_explanations, blacklist=blacklist, acyclic=acyclic)
+        num_triples += buf.size
+        curtime = time.time()
+        if curtime > end_time:
+            LOG.debug("RUNTIME LIMIT EXCEEDED: {} > {}. EXITING".format(curtime, end_time))
+            break
+    if workers is not None:
+        LOG.debug("READ {} TRIPLES USING {} WORKERS".format(num_triples, len(workers.workers)))
+    else:
+        LOG.debug("READ {} TRIPLES USING {} READERS".format(num_triples, readers))
+    return new_explanations
+
+
+def evaluate_explanations(new_explanations: Set[Explanation], examples: Examples, minimum_score: float,
+                          negatives: LazyNegatives = None) -> Iterator[Explanation]:
+    if negatives is not None:
+        new_explanations = negatives.candidates(new_explanations, minimum_score)
+    if len(new_explanations) > 0:
+        explanation_evaluation.find_best_explanation(new_explanations, examples)
+        for exp in new_explanations:
+            if exp.record is not None and exp.record.score >= minimum_score:
+                yield exp
+
+
+def frontier(best_paths: List[Path]) -> Dict[Vertex, List[Path]]:
+    # End-points shared by multiple paths are fetched from the HDT file only once per round.
+    nodes: Dict[Vertex, List[Path]] = {}
+    for best_path in best_paths:
+        for v in best_path.get_frontier():
+            nodes.setdefault(v, []).append(best_path)
+    return nodes
+
+
 def _print_progress(number_of_nodes: int, current_node_index: int, round_number: int) -> None:
     if number_of_nodes > 10000 and current_node_index % 1000 == 0:
         LOG.debug("Round {} at {}%".format(round_number, int(current_node_index/number_of_nodes*100)))
 
 
-def follow_outgoing_links(node: Vertex, best_path: Path, paths: Dict[Path, Path], end_time: float,
-                          examples: Examples, blacklist: Blacklist = None) -> Set[Explanation]:
+def follow_outgoing_links(node: Vertex, best_paths: List[Path], paths: Dict[Path, Path], end_time: float,
+                          examples: Examples, blacklist: Blacklist = None, acyclic: bool = False,
+                          adjacency: AdjacencyCache = None) -> Set[Explanation]:
     new_explanations: Set[Explanation] = set()
-    triples, k = local_hdt.document().search_triples_ids(node.s_id, 0, 0)
+    if adjacency is not None:
+        triples = adjacency.triples(node.s_id)
+    else:
+        triples, _ = local_hdt.document().search_triples_ids(node.s_id, 0, 0)
     for s_id, p_id, o_id in triples:
-        s = Vertex.fromSubjectId(s_id)
-        p = Predicate(p_id)
-        o = Vertex.fromObjectId(o_id)
-        # Create new path.
-        if blacklist is not None and blacklist.isBlacklisted(p):
-            continue
-        path = best_path.extend(paths, s, p, o)
-        exp = Explanation(path, o)
-        new_explanations.add(exp)
+        follow_link(Vertex.fromSubjectId(s_id), p_id, o_id, best_paths, paths, new_explanations, blacklist=blacklist,
+                    acyclic=acyclic)
         if time.time() > end_time:
             break
     return new_explanations
 
 
+def follow_link(s: Vertex, p_id: int, o_id: int, best_paths: List[Path], paths: Dict[Path, Path],
+                new_explanations: Set[Explanation], blacklist: Blacklist = None, acyclic: bool = False) -> None:
+    if blacklist is not None and blacklist.isBlacklistedId(p_id):
+        return
+    p = Predicate.fromId(p_id)
+    o = Vertex.fromObjectId(o_id)
+    # Create new path.
+    for best_path in best_paths:
+        path = best_path.extend(paths, s, p, o, acyclic=acyclic)
+        if path is None:
+            continue
+        exp = Explanation(path, o)
+        new_explanations.add(exp)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("example_file")
-    parser.add_argument("--hdt-file", type=str, default="/scratch/wbeek/data/LOD-a-lot/data.hdt", help="Location of HDT file to use.")
+    parser.add_argument("--hdt-file", type=str, nargs="+", default="/scratch/wbeek/data/LOD-a-lot/data.hdt", help="Location of HDT file to use. \
+        Multiple files are searched together.")
+    parser.add_argument("--mmap", action="store_true", help="Check the index of the HDT file first, and build it with progress reports if it is missing.")
     parser.add_argument("--groupid", type=int, help="The positive examples group number.")
     parser.add_argument("--truncate", "-t", type=int, help="Selects the first x positive and negative examples. The resulting input has size 2x.")
     parser.add_argument("--balance", "-b", action="store_true", help="Makes sure that the number of positive examples equals the number of negative examples. \
         This is performed after truncate.")
 
     parser.add_argument("--heuristic", type=str, choices=HEURISTIC_NAMES, default="entropy", help="The search heuristic to use.")
+    parser.add_argument("--priors", type=str, help="File with the best scores per predicate sequence in previous runs. \
+        The best sequences get a bonus in the first rounds.")
 
+    parser.add_argument("--beam", type=int, default=1, help="Number of paths to explore per round.")
+    parser.add_argument("--bidirectional", type=int, default=0, help="Search forward and backward for explanations up to given length.")
+    parser.add_argument("--collapse", action="store_true", help="Explore paths that connect the same examples to the same end-points only once.")
     parser.add_argument("--complete", "-c", type=int, default=0, help="Perform a complete search of all paths up to given length.")
     parser.add_argument("--runtime", type=float, default=math.inf, help="Number of seconds the program is allowed to run.")
     parser.add_argument("--rounds", default=math.inf, help="Number of rounds the program is allowed to run.")
     parser.add_argument("--memlimit", type=int, default=2**35, help="Stops the program once it uses more than the given amount of RAM in bytes.")
+    parser.add_argument("--soft-memlimit", type=float, default=math.inf, help="Drops the least promising paths once they use more than the given amount \
+        of RAM in bytes.")
+
+    parser.add_argument("--readers", type=int, default=0, help="Number of threads that read triples from the HDT file while paths are updated.")
+    parser.add_argument("--workers", type=str, nargs="+", help="Addresses (host:port) of workers that read triples from the same HDT file.")
+    parser.add_argument("--adjacency-cache", type=float, default=0, help="Keep the outgoing links of recently expanded vertices in a cache \
+        of at most this many bytes.")
+
+    parser.add_argument("--sample", type=int, default=0, help="Search using a stratified sample of this many examples.")
+
+    parser.add_argument("--lazy-negatives", action="store_true", help="Only trace negative examples along paths with promising explanations.")
+
+    parser.add_argument("--acyclic", action="store_true", help="Do not follow links back to vertices the examples already reached.")
 
     parser.add_argument("--prefix", type=str, help="File containing URI prefixes. Two columns [abbrv prefix] separated by whitespace.")
     parser.add_argument("--blacklist", type=str, help="File containing blacklisted URIs. The program does not follow these links.")
+    parser.add_argument("--auto-blacklist", type=float, default=0, help="Also blacklist predicates with more than this many links per example \
+        that do not distinguish the examples.")
 
     parser.add_argument("--prune", "-p", type=str, choices=PATH_PRUNER_NAMES, default="gle", help="Selects path-prune policy.")
     parser.add_argument("--minimum_score", type=float, default=-1, help="Explanations with scores less or equal to given value are not printed.")
+    parser.add_argument("--combine", type=int, default=0, help="Combine up to this many of the best explanations into conjunctions and \
+        disjunctions when the search ends.")
+    parser.add_argument("--combine-candidates", type=int, default=combination.CANDIDATES, help="Number of best explanations to combine.")
 
     parser.add_argument("--mem-profile", action="store_true", help="Occassionally log memory usage. Can help with finding memory leaks.")
+    parser.add_argument("--cache", type=str, help="Directory in which search results are cached and replayed.")
+    parser.add_argument("--cache-size", type=int, default=2**30, help="Maximum size of the result cache in bytes.")
     args = parser.parse_args()
 
     ch = logging.StreamHandler()
@@ -0,0 +1,332 @@
+import argparse
+import collections
+import logging
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+from array import array
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from . import local_hdt
+from . import result_cache
+from .adjacency import AdjacencyCache
+from .knowledge_graph import Vertex
+from .pipeline import TripleBuffer
+
+LOG = logging.getLogger('dedalov2.distributed')
+
+# Number of subjects sent to a worker per request.
+SHARD_SUBJECTS = 256
+# Largest message accepted from a client, and from a worker.
+MAX_REQUEST_BYTES = 1 << 24
+MAX_RESPONSE_BYTES = 1 << 32
+# Seconds to wait for a worker before it is considered failed.
+CONNECT_TIMEOUT = 10
+REQUEST_TIMEOUT = 300
+
+# Messages are a type byte and a payload length, followed by the payload. IDs are sent as little-endian 64-bit integers.
+HEADER = struct.Struct("!BQ")
+HELLO = 1
+SHARD = 2
+TRIPLES = 3
+ERROR = 4
+
+
+def _to_bytes(ids: array) -> bytes:
+    if sys.byteorder == "big":
+        ids = array('q', ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def _from_bytes(data: bytes) -> array:
+    ids = array('q')
+    ids.frombytes(data)
+    if sys.byteorder == "big":
+        ids.byteswap()
+    return ids
+
+
+def _send(sock: socket.socket, kind: int, payload: bytes) -> None:
+    sock.sendall(HEADER.pack(kind, len(payload)))
+    sock.sendall(payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytearray:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Connection closed.")
+        received += n
+    return buf
+
+
+def _recv(sock: socket.socket, max_size: int) -> Tuple[int, bytes]:
+    kind, size = HEADER.unpack(_recv_exactly(sock, HEADER.size))
+    if size > max_size:
+        raise ValueError("Message of {} bytes exceeds the limit of {} bytes.".format(size, max_size))
+    return kind, bytes(_recv_exactly(sock, size))
+
+
+def read_shard(subjects: array) -> array:
+    triples_ids = array('q')
+    for s_id in subjects:
+        triples, _ = local_hdt.document().search_triples_ids(s_id, 0, 0)
+        for triple in triples:
+            triples_ids.extend(triple)
+    return triples_ids
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        _send(self.request, HELLO, self.server.fingerprint.encode())
+        while True:
+            try:
+                kind, payload = _recv(self.request, MAX_REQUEST_BYTES)
+            except ConnectionError:
+                return
+            except ValueError as e:
+                _send(self.request, ERROR, str(e).encode())
+                return
+            if kind != SHARD:
+                _send(self.request, ERROR, "Unexpected message type {}.".format(kind).encode())
+                return
+            try:
+                triples_ids = read_shard(_from_bytes(payload))
+            except Exception as e:
+                LOG.error("Reading shard failed: {}".format(e))
+                _send(self.request, ERROR, str(e).encode())
+                continue
+            _send(self.request, TRIPLES, _to_bytes(triples_ids))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int], fingerprint: str):
+        super().__init__(address, _Handler)
+        self.fingerprint: str = fingerprint
+
+
+def make_server(host: str, port: int, fingerprint: str) -> socketserver.ThreadingTCPServer:
+    # Serves triples from the HDT file that is currently loaded by local_hdt.
+    return _Server((host, port), fingerprint)
+
+
+def serve(hdt_file: str, host: str = "127.0.0.1", port: int = 5000, mmap: bool = False) -> None:
+    # Workers do not authenticate clients, so only listen on other interfaces inside a trusted network.
+    local_hdt.init(hdt_file, mmap=mmap)
+    with make_server(host, port, result_cache.hdt_fingerprint(hdt_file)) as server:
+        LOG.info("Serving {} on {}:{}.".format(hdt_file, host, server.server_address[1]))
+        server.serve_forever()
+
+
+class Worker:
+
+    def __init__(self, address: str):
+        host, _, port = address.rpartition(":")
+        if host == "" or not port.isdigit():
+            raise ValueError("{} is not a valid worker address. Use host:port.".format(address))
+        self.address: str = address
+        self.host: str = host
+        self.port: int = int(port)
+        self.sock: Optional[socket.socket] = None
+        # A request is answered before the next one is sent, also if a previous round left it in flight.
+        self.lock = threading.Lock()
+
+    def connect(self, fingerprint: str) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        try:
+            kind, payload = _recv(sock, MAX_RESPONSE_BYTES)
+            if kind != HELLO:
+                raise ValueError("Worker {} did not introduce itself.".format(self.address))
+            if payload.decode() != fingerprint:
+                raise ValueError("Worker {} serves a different HDT file.".format(self.address))
+            sock.settimeout(REQUEST_TIMEOUT)
+        except BaseException:
+            sock.close()
+            raise
+        self.sock = sock
+
+    def alive(self) -> bool:
+        return self.sock is not None
+
+    def request(self, subjects: array) -> array:
+        with self.lock:
+            if self.sock is None:
+                raise ConnectionError("Worker {} is not connected.".format(self.address))
+            _send(self.sock, SHARD, _to_bytes(subjects))
+            kind, payload = _recv(self.sock, MAX_RESPONSE_BYTES)
+        if kind == ERROR:
+            raise ValueError("Worker {} failed: {}".format(self.address, payload.decode(errors="replace")))
+        if kind != TRIPLES:
+            raise ValueError("Worker {} sent unexpected message type {}.".format(self.address, kind))
+        return _from_bytes(payload)
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+class WorkerPool:
+
+    def __init__(self, addresses: List[str], fingerprint: str):
+        self.workers: List[Worker] = []
+        for address in addresses:
+            worker = Worker(address)
+            try:
+                worker.connect(fingerprint)
+            except (OSError, ValueError) as e:
+                LOG.warning("Not using worker {}: {}".format(address, e))
+                continue
+            self.workers.append(worker)
+        if len(self.workers) == 0:
+            raise ValueError("None of the workers {} is available.".format(", ".join(addresses)))
+        self.stolen: int = 0
+        LOG.debug("CONNECTED TO {} WORKERS".format(len(self.workers)))
+
+    def close(self) -> None:
+        for worker in self.workers:
+            worker.close()
+
+    def outgoing_triples(self, nodes: List[Vertex], shard_subjects: int = SHARD_SUBJECTS,
+                         adjacency: AdjacencyCache = None) -> Iterator[TripleBuffer]:
+        # Shards of subjects are read by the workers, see _ShardQueues, and read locally if no worker is left.
+        # Subjects in the adjacency cache are not sent to the workers. Their triples are passed on first. Workers return
+        # shards in no particular order anyway, so this does not change whether the search is deterministic.
+        workers = [worker for worker in self.workers if worker.alive()]
+        subjects = [v.s_id for v in nodes]
+        if adjacency is not None:
+            cached, subjects = _split_cached(subjects, adjacency)
+            if len(cached) > 0:
+                yield _buffer(cached)
+        shards = [array('q', subjects[i:i + shard_subjects]) for i in range(0, len(subjects), shard_subjects)]
+        queues = _ShardQueues(shards, len(workers))
+        results: queue.Queue = queue.Queue()
+        stop = threading.Event()
+        threads = [threading.Thread(target=_run, args=(worker, i, queues, results, stop, adjacency), daemon=True)
+                   for i, worker in enumerate(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            done = 0
+            while done < len(threads):
+                triples_ids = results.get()
+                if triples_ids is None:
+                    done += 1
+                    continue
+                yield _buffer(triples_ids)
+            leftover = queues.leftover()
+            if len(leftover) > 0:
+                LOG.warning("No worker is left. Reading {} shards locally.".format(len(leftover)))
+            for shard in leftover:
+                yield _buffer(_read_shard(shard, adjacency))
+        finally:
+            stop.set()
+            self.stolen += queues.stolen
+        LOG.debug("STOLE {} SHARDS SO FAR".format(self.stolen))
+
+
+class _ShardQueues:
+    # Shards are divided over the workers up front. A worker that runs out of shards steals from the end of the
+    # longest remaining queue. Shards of failed workers stay queued for the others.
+
+    def __init__(self, shards: List[array], num_workers: int):
+        num_queues = max(1, num_workers)
+        self.queues: List[Deque[array]] = [collections.deque(shards[i::num_queues]) for i in range(num_queues)]
+        self.lock = threading.Lock()
+        self.stolen: int = 0
+
+    def take(self, i: int) -> Optional[array]:
+        with self.lock:
+            if len(self.queues[i]) > 0:
+                return self.queues[i].popleft()
+            victim = max(self.queues, key=len)
+            if len(victim) > 0:
+                self.stolen += 1
+                return victim.pop()
+            return None
+
+    def put_back(self, i: int, shard: array) -> None:
+        with self.lock:
+            self.queues[i].appendleft(shard)
+
+    def leftover(self) -> List[array]:
+        with self.lock:
+            return [shard for q in self.queues for shard in q]
+
+
+def _run(worker: Worker, i: int, queues: _ShardQueues, results: queue.Queue, stop: threading.Event,
+         adjacency: AdjacencyCache = None) -> None:
+    # Requests shards for the i-th worker until none are left. None is put in results when the worker is done.
+    try:
+        while not stop.is_set():
+            shard = queues.take(i)
+            if shard is None:
+                break
+            try:
+                triples_ids = worker.request(shard)
+            except (OSError, ValueError) as e:
+                LOG.warning("Worker {} failed: {}. Its shards are moved to the other workers.".format(worker.address, e))
+                worker.close()
+                queues.put_back(i, shard)
+                break
+            if adjacency is not None:
+                adjacency.put_triples(shard, triples_ids)
+            results.put(triples_ids)
+    finally:
+        results.put(None)
+
+
+def _split_cached(subjects: List[int], adjacency: AdjacencyCache) -> Tuple[array, List[int]]:
+    # Returns the triples of the subjects in the adjacency cache, and the subjects that are not in it.
+    cached = array('q')
+    missing = []
+    for s_id in subjects:
+        links = adjacency.get(s_id)
+        if links is None:
+            missing.append(s_id)
+            continue
+        for i in range(0, len(links), 2):
+            cached.extend((s_id, links[i], links[i + 1]))
+    return cached, missing
+
+
+def _read_shard(subjects: array, adjacency: AdjacencyCache = None) -> array:
+    triples_ids = read_shard(subjects)
+    if adjacency is not None:
+        adjacency.put_triples(subjects, triples_ids)
+    return triples_ids
+
+
+def _buffer(triples_ids: array) -> TripleBuffer:
+    buf = TripleBuffer(0)
+    buf.ids = triples_ids
+    buf.size = len(triples_ids) // 3
+    return buf
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve triples from an HDT file to a dedalov2 search.")
+    parser.add_argument("--hdt-file", type=str, required=True, help="Location of HDT file to serve. Must be the same file the search uses.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on. Workers do not authenticate clients, \
+        so only listen on other interfaces, such as 0.0.0.0, inside a trusted network.")
+    parser.add_argument("--port", type=int, default=5000, help="Port to listen on.")
+    parser.add_argument("--mmap", action="store_true", help="Check the index of the HDT file first, and build it with progress reports if it is missing.")
+    args = parser.parse_args()
+
+    ch = logging.StreamHandler()
+    ch.setFormatter(logging.Formatter('%(asctime)s %(levelname)-8s %(message)s', '%Y-%m-%d %H:%M:%S'))
+    logging.getLogger('').addHandler(ch)
+    logging.getLogger().setLevel(logging.INFO)
+
+    serve(args.hdt_file, host=args.host, port=args.port, mmap=args.mmap)
@@ -1,6 +1,7 @@
 
 import logging
 import os
+import random
 from typing import Iterator, List
 
 from .knowledge_graph import Vertex
@@ -8,6 +9,7 @@ from .knowledge_graph import Vertex
 LOG = logging.getLogger('dedalov2.example')
 
 class Example:
+    __slots__ = ("vertex", "positive")
 
     @staticmethod
     def fromString(uri: str, positive: bool = True) -> 'Example':
@@ -89,6 +91,20 @@ class Examples:
         self.positives = self.positives[:m]
         self.negatives = self.negatives[:m]
 
+    def sample(self, size: int, seed: int = 0) -> 'Examples':
+        # Stratified sample that keeps the ratio of positive and negative examples, and at least one of each.
+        assert size > 0
+        rnd = random.Random(seed)
+        num_positives = round(size * len(self.positives) / len(self))
+        if len(self.negatives) > 0:
+            num_positives = min(num_positives, size - 1)
+        num_positives = min(max(num_positives, 1), len(self.positives))
+        num_negatives = min(size - num_positives, len(self.negatives))
+        res = Examples()
+        res.positives = [self.positives[i] for i in sorted(rnd.sample(range(len(self.positives)), num_positives))]
+        res.negatives = [self.negatives[i] for i in sorted(rnd.sample(range(len(self.negatives)), num_negatives))]
+        return res
+
     def __len__(self):
         return len(self.positives) + len(self.negatives)
 
@@ -1,5 +1,5 @@
 
-from typing import Optional, Set
+from typing import List, Optional, Set
 
 from .example import Example, Examples
 from .knowledge_graph import Vertex
@@ -7,6 +7,8 @@ from .path import Path
 
 
 class Explanation:
+    __slots__ = ("path", "value", "record")
+
     def __init__(self, p: Path, value: Vertex):
         self.path: Path = p
         self.value: Vertex = value
@@ -15,6 +17,9 @@ class Explanation:
     def explains(self, examples: Examples) -> Set[Example]:
         return self.path.get_starting_points_connected_to_endpoint(self.value)
 
+    def alternatives(self) -> List[str]:
+        return [Path.edges_to_str(edges) for edges in self.path.alternatives]
+
     def __lt__(self, other):
         return self.path < other.path
 
@@ -25,10 +30,14 @@ class Explanation:
         return hash(self.path)*31+hash(self.value)
 
     def __str__(self):
+        if len(self.path.alternatives) > 0:
+            return "{} -| {} ALTERNATIVES: {}".format(self.path, self.value, " | ".join(self.alternatives()))
         return "{} -| {}".format(self.path, self.value)
 
 
 class Record:
+    __slots__ = ("explanation", "score", "num_examples", "num_positives", "num_connected_positives", "num_connected_negatives")
+
     def __init__(self, explanation: Explanation, score: float, num_examples: int = None, num_positives: int = None,
                  num_connected_positives: int = None, num_connected_negatives: int = None):
         self.explanation: Explanation = explanation
@@ -26,11 +26,17 @@ def fuzzy_f_measure(e: Explanation, examples: Examples) -> float:
 
 
 def max_fuzzy_f_measure(p: Path, examples: Examples) -> float:
-    return _fuzzy_f_measure(p.get_starting_points(), examples)
+    if p.upper_bound is None:
+        num_positives = len(examples.positives)
+        p.upper_bound = _fuzzy_f_measure_counts(p.num_positive_starts, p.num_negative_starts, num_positives - p.num_positive_starts)
+    return p.upper_bound
 
 
 def _fuzzy_f_measure(roots: Set[Example], examples: Examples) -> float:
-    ftp_value, ffp_value, ffn_value = _tfpn_roots_positives(roots, set(examples.positives))
+    return _fuzzy_f_measure_counts(*_tfpn_roots_positives(roots, set(examples.positives)))
+
+
+def _fuzzy_f_measure_counts(ftp_value: float, ffp_value: float, ffn_value: float) -> float:
     fp_value = fp(ftp_value, ffp_value)
     fr_value = fr(ftp_value, ffn_value)
     if fp_value + fr_value == 0:
@@ -0,0 +1,110 @@
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import hdt
+
+LOG = logging.getLogger('dedalov2.federation')
+
+Triple = Tuple[int, int, int]
+
+
+class IdMap:
+    # Global IDs of the terms in one position, resolved across partitions by URI.
+    # Both directions are cached per partition. A cached local ID of 0 means the term does not occur in that partition.
+
+    def __init__(self, num_partitions: int):
+        self.uris: List[str] = [""]
+        self.ids: Dict[str, int] = {}
+        self.to_local: List[Dict[int, int]] = [{} for _ in range(num_partitions)]
+        self.to_global: List[Dict[int, int]] = [{} for _ in range(num_partitions)]
+        self.lock = threading.Lock()
+
+    def assign(self, uri: str) -> int:
+        with self.lock:
+            g = self.ids.get(uri)
+            if g is None:
+                g = self.ids[uri] = len(self.uris)
+                self.uris.append(uri)
+        return g
+
+
+class FederatedDocument:
+    # Presents several HDT files as a single document. Only the methods of hdt.HDTDocument used by dedalov2 are supported.
+    # Lookups read the partitions one after another. The readers of the pipeline read the partitions concurrently instead,
+    # see partition_triples.
+
+    def __init__(self, documents: List[hdt.HDTDocument]):
+        self.documents: List[hdt.HDTDocument] = documents
+        self.maps: Dict[hdt.IdentifierPosition, IdMap] = {
+            pos: IdMap(len(documents)) for pos in (hdt.IdentifierPosition.Subject, hdt.IdentifierPosition.Predicate,
+                                                   hdt.IdentifierPosition.Object)
+        }
+
+    @property
+    def nb_predicates(self) -> int:
+        # Assigns a global ID to every predicate, so that all of them can be enumerated.
+        pos = hdt.IdentifierPosition.Predicate
+        for i, doc in enumerate(self.documents):
+            for local in range(1, doc.nb_predicates + 1):
+                self._global(i, local, pos)
+        return len(self.maps[pos].uris) - 1
+
+    def convert_term(self, uri: str, pos: hdt.IdentifierPosition) -> int:
+        m = self.maps[pos]
+        g = m.ids.get(uri)
+        if g is not None:
+            return g
+        if all(doc.convert_term(uri, pos) <= 0 for doc in self.documents):
+            return 0
+        return m.assign(uri)
+
+    def convert_id(self, id: int, pos: hdt.IdentifierPosition) -> str:
+        return self.maps[pos].uris[id]
+
+    def search_triples_ids(self, s: int, p: int, o: int) -> Tuple[List[Triple], int]:
+        triples: List[Triple] = []
+        for i in range(len(self.documents)):
+            triples.extend(self.partition_triples(i, s, p, o))
+        if len(self.documents) > 1:
+            # The same triple can be stored in more than one partition.
+            triples = list(dict.fromkeys(triples))
+        return triples, len(triples)
+
+    def partition_triples(self, i: int, s: int, p: int, o: int) -> List[Triple]:
+        # The matching triples of partition i, with global IDs. Triples that are also stored in other partitions are included.
+        query = self._local_query(i, s, p, o)
+        if query is None:
+            return []
+        local_triples, _ = self.documents[i].search_triples_ids(*query)
+        return [(self._global(i, ls, hdt.IdentifierPosition.Subject),
+                 self._global(i, lp, hdt.IdentifierPosition.Predicate),
+                 self._global(i, lo, hdt.IdentifierPosition.Object)) for ls, lp, lo in local_triples]
+
+    def _local_query(self, i: int, s: int, p: int, o: int) -> Optional[Triple]:
+        # Returns None if one of the given terms does not occur in partition i.
+        local = (self._local(i, s, hdt.IdentifierPosition.Subject),
+                 self._local(i, p, hdt.IdentifierPosition.Predicate),
+                 self._local(i, o, hdt.IdentifierPosition.Object))
+        if any(g != 0 and l == 0 for g, l in zip((s, p, o), local)):
+            return None
+        return local
+
+    def _local(self, i: int, g: int, pos: hdt.IdentifierPosition) -> int:
+        if g == 0:
+            return 0
+        m = self.maps[pos]
+        local = m.to_local[i].get(g)
+        if local is None:
+            local = max(self.documents[i].convert_term(m.uris[g], pos), 0)
+            m.to_local[i][g] = local
+        return local
+
+    def _global(self, i: int, local: int, pos: hdt.IdentifierPosition) -> int:
+        m = self.maps[pos]
+        g = m.to_global[i].get(local)
+        if g is None:
+            g = m.assign(self.documents[i].convert_id(local, pos))
+            m.to_global[i][local] = g
+            m.to_local[i][g] = local
+        return g
@@ -1,17 +1,42 @@
 
+from typing import Dict, Iterable, Set
+
 import hdt
 from . import local_hdt
 from . import urishortener
 
+# Interned instances, so that every HDT ID is represented by a single object.
+# IDs are specific to an HDT file, so these must be cleared when another file is loaded.
+_predicates: Dict[int, 'Predicate'] = {}
+_subjects: Dict[int, 'Vertex'] = {}
+_objects: Dict[int, 'Vertex'] = {}
+# Maximum number of interned vertices per table. Vertices are compared by ID, so a full table is simply cleared.
+# Vertices that are still in use stay valid, but are no longer shared with vertices created afterwards.
+MAX_INTERNED = 1 << 20
+
+
+def clear_interned() -> None:
+    _predicates.clear()
+    _subjects.clear()
+    _objects.clear()
+
 
 class Predicate:
+    __slots__ = ("id",)
 
     @staticmethod
     def fromString(id: str):
         int_value = local_hdt.document().convert_term(id, hdt.IdentifierPosition.Predicate)
         if int_value <= 0:
             raise ValueError("{} does not exist as Predicate.".format(id))
-        return Predicate(int_value)
+        return Predicate.fromId(int_value)
+
+    @staticmethod
+    def fromId(id: int) -> 'Predicate':
+        p = _predicates.get(id)
+        if p is None:
+            p = _predicates[id] = Predicate(id)
+        return p
 
     def __init__(self, id: int):
         self.id: int = id
@@ -26,6 +51,7 @@ class Predicate:
         return self.id
 
 class Vertex:
+    __slots__ = ("s_id", "o_id")
 
     @staticmethod
     def fromString(id: str) -> 'Vertex':
@@ -37,19 +63,41 @@ class Vertex:
         
     @staticmethod
     def fromSubjectId(id: int) -> 'Vertex':
+        v = _subjects.get(id)
+        if v is not None:
+            return v
         if id == 0:
             raise ValueError("0 is not a valid Subject ID.")
         uri = local_hdt.document().convert_id(id, hdt.IdentifierPosition.Subject)
         o_id = local_hdt.document().convert_term(uri, hdt.IdentifierPosition.Object)
-        return Vertex(s_id=id, o_id=o_id)
+        return Vertex._intern(Vertex(s_id=id, o_id=o_id))
 
     @staticmethod
     def fromObjectId(id: int) -> 'Vertex':
+        v = _objects.get(id)
+        if v is not None:
+            return v
         if id == 0:
             raise ValueError("0 is not a valid Object ID.")
+        if id > local_hdt.nb_shared:
+            # Objects outside the shared section, such as literals, have no outgoing links. They are not interned,
+            # because they are only ever reached once by most paths.
+            return Vertex(s_id=0, o_id=id)
         uri = local_hdt.document().convert_id(id, hdt.IdentifierPosition.Object)
         s_id = local_hdt.document().convert_term(uri, hdt.IdentifierPosition.Subject)
-        return Vertex(s_id=s_id, o_id=id)
+        return Vertex._intern(Vertex(s_id=s_id, o_id=id))
+
+    @staticmethod
+    def _intern(v: 'Vertex') -> 'Vertex':
+        if v.s_id > 0:
+            if len(_subjects) >= MAX_INTERNED:
+                _subjects.clear()
+            _subjects[v.s_id] = v
+        if v.o_id > 0:
+            if len(_objects) >= MAX_INTERNED:
+                _objects.clear()
+            _objects[v.o_id] = v
+        return v
 
     def __init__(self, s_id: int = 0, o_id: int = 0):
         if s_id == 0 and o_id == 0:
@@ -79,3 +127,25 @@ class Vertex:
 
     def __hash__(self):
         return self.s_id * 31 + self.o_id
+
+
+def follow_predicates(start: Vertex, predicates: Iterable[Predicate], acyclic: bool = False) -> Set[Vertex]:
+    # All vertices reached from start by following the given predicates in order.
+    # If acyclic, vertices reached by a shorter prefix of the predicates are not visited again.
+    current: Set[Vertex] = {start}
+    visited: Set[Vertex] = {start}
+    for p in predicates:
+        reached: Set[Vertex] = set()
+        for v in current:
+            if not v.is_subject():
+                continue
+            triples, _ = local_hdt.document().search_triples_ids(v.s_id, p.id, 0)
+            for _, _, o_id in triples:
+                reached.add(Vertex.fromObjectId(o_id))
+        if acyclic:
+            reached -= visited
+            visited |= reached
+        current = reached
+        if len(current) == 0:
+            break
+    return current
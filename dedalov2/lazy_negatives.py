@@ -0,0 +1,49 @@
+import logging
+from typing import Set
+
+from .example import Examples
+from .explanation import Explanation
+from .knowledge_graph import follow_predicates
+from .path import Path
+
+LOG = logging.getLogger('dedalov2.lazy_negatives')
+
+
+# Paths are first expanded from the positive examples only. Negative examples can only lower the score of an explanation,
+# so they are traced along a path once one of its explanations could still reach the minimum score.
+class LazyNegatives:
+
+    def __init__(self, examples: Examples, acyclic: bool = False):
+        self.examples: Examples = examples
+        self.acyclic: bool = acyclic
+        self.traced: int = 0
+        self.skipped: int = 0
+
+    def root(self) -> Path:
+        path = Path.from_examples(self.examples.positives)
+        path.negatives_traced = False
+        return path
+
+    def candidates(self, explanations: Set[Explanation], minimum_score: float) -> Set[Explanation]:
+        num_positives = len(self.examples.positives)
+        res: Set[Explanation] = set()
+        for exp in explanations:
+            tp = sum(1 for e in exp.explains(self.examples) if e.positive)
+            # F-measure of the explanation if it is not connected to any negative example.
+            upper_bound = 2 * tp / (tp + num_positives)
+            if tp == 0 or upper_bound < minimum_score:
+                self.skipped += 1
+                continue
+            self.trace(exp.path)
+            res.add(exp)
+        LOG.debug("TRACED NEGATIVES ALONG {} PATHS. SKIPPED {} EXPLANATIONS".format(self.traced, self.skipped))
+        return res
+
+    def trace(self, path: Path) -> None:
+        if path.negatives_traced:
+            return
+        for e in self.examples.negatives:
+            for v in follow_predicates(e.vertex, path.edges, acyclic=self.acyclic):
+                path.connect(v, {e})
+        path.negatives_traced = True
+        self.traced += 1
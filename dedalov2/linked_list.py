@@ -1,5 +1,7 @@
 
 class LinkedNode:
+    __slots__ = ("value", "prev", "len")
+
     def __init__(self, value, prev=None):
         self.value = value
         self.prev = prev
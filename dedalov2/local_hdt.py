@@ -1,24 +1,93 @@
-
 import logging
+import math
 import os
-from typing import Optional
+import threading
+import time
+from typing import List, Optional, Union
 
 import hdt
+from .federation import FederatedDocument
 
-doc: Optional[hdt.HDTDocument]
+doc: Optional[Union[hdt.HDTDocument, FederatedDocument]] = None
+# Number of terms that are both subject and object. Object IDs above this number are never subjects.
+# Unknown for multiple HDT files, whose IDs are not ordered this way.
+nb_shared: float = math.inf
 
 LOG = logging.getLogger('dedalov2.local_hdt')
 
-def init(hdt_file_path: str):
-    if not os.path.isfile(hdt_file_path):
-        raise ValueError("{} is not a valid HDT file.".format(hdt_file_path))
+# Suffixes of the index files written by hdt-cpp, newest format first.
+INDEX_SUFFIXES = (".index.v1-1", ".index")
+# Suffix appended to an empty index file that is moved aside.
+STALE_SUFFIX = ".stale"
+# Seconds between progress messages while an index is built.
+PROGRESS_INTERVAL = 30
+
+
+def init(hdt_file_path: Union[str, List[str]], mmap: bool = False):
+    hdt_file_paths = [hdt_file_path] if isinstance(hdt_file_path, str) else list(hdt_file_path)
+    if len(hdt_file_paths) == 0:
+        raise ValueError("No HDT file given.")
+    for path in hdt_file_paths:
+        if not os.path.isfile(path):
+            raise ValueError("{} is not a valid HDT file.".format(path))
+    global doc, nb_shared
+    documents = [_open(path, mmap) for path in hdt_file_paths]
+    if len(documents) == 1:
+        doc = documents[0]
+        nb_shared = doc.nb_shared
+    else:
+        LOG.debug("Searching {} HDT files together.".format(len(documents)))
+        doc = FederatedDocument(documents)
+        nb_shared = math.inf
+
+
+def _open(hdt_file_path: str, mmap: bool) -> hdt.HDTDocument:
+    # pyHDT maps the HDT file and its index by default. It also builds a missing index, but without reporting progress.
+    if mmap and find_index(hdt_file_path) is None:
+        return _build_index(hdt_file_path)
     LOG.debug("Loading LOD-a-lot file.")
-    global doc
-    doc = hdt.HDTDocument(hdt_file_path)
+    document = hdt.HDTDocument(hdt_file_path)
     LOG.debug("Loaded LOD-a-lot file.")
+    return document
+
+
+def find_index(hdt_file_path: str) -> Optional[str]:
+    # Returns the index file of the given HDT file, or None if it has to be built.
+    for suffix in INDEX_SUFFIXES:
+        index_file = hdt_file_path + suffix
+        if not os.path.isfile(index_file):
+            continue
+        if os.path.getsize(index_file) == 0:
+            # Left behind by an interrupted build.
+            LOG.warning("Index {} is empty. Moving it to {} and building it again.".format(index_file, index_file + STALE_SUFFIX))
+            os.replace(index_file, index_file + STALE_SUFFIX)
+            continue
+        LOG.debug("Using index {}.".format(index_file))
+        return index_file
+    return None
+
+
+def _build_index(hdt_file_path: str) -> hdt.HDTDocument:
+    # hdt-cpp does not report its progress, so only log how long it has been running.
+    LOG.info("No index found for {}. Building it once. This can take a long time for large files.".format(hdt_file_path))
+    start = time.time()
+    done = threading.Event()
+
+    def report():
+        while not done.wait(PROGRESS_INTERVAL):
+            LOG.info("Building index for {}: {:.0f} seconds elapsed.".format(hdt_file_path, time.time() - start))
+    reporter = threading.Thread(target=report, daemon=True)
+    reporter.start()
+    try:
+        document = hdt.HDTDocument(hdt_file_path)
+    finally:
+        done.set()
+        reporter.join()
+    LOG.info("Built index for {} in {:.0f} seconds.".format(hdt_file_path, time.time() - start))
+    return document
 
 
-def document() -> hdt.HDTDocument:
+def document() -> Union[hdt.HDTDocument, FederatedDocument]:
     if doc is None:
         raise ValueError("HDT Document not initialized.")
     return doc
@@ -0,0 +1,55 @@
+import logging
+import math
+from typing import Dict
+
+from .example import Examples
+from .explanation_evaluation import max_fuzzy_f_measure
+from .path import Path
+from .path_evaluation import SearchHeuristic, heuristic_score
+
+LOG = logging.getLogger('dedalov2.memory_governor')
+
+# Rough CPython sizes of a path, of one of its end-points, of one example-to-end-point link,
+# and of the visited end-points of one starting point in acyclic searches, which are shared with the prefixes of the path.
+PATH_BYTES = 600
+END_POINT_BYTES = 300
+LINK_BYTES = 70
+VISITED_BYTES = 130
+
+
+def estimate_path_size(path: Path) -> int:
+    visited = 0 if path.visited is None else len(path.visited)
+    return PATH_BYTES + END_POINT_BYTES * path.num_end_points() + LINK_BYTES * path.num_links + VISITED_BYTES * visited
+
+
+class MemoryGovernor:
+
+    def __init__(self, soft_limit: float = math.inf, evict_fraction: float = 0.25):
+        assert 0 < evict_fraction <= 1
+        self.soft_limit: float = soft_limit
+        self.evict_fraction: float = evict_fraction
+        self.estimate: int = 0
+
+    def update(self, paths: Dict[Path, Path]) -> int:
+        self.estimate = sum(estimate_path_size(path) for path in paths)
+        return self.estimate
+
+    def __call__(self, paths: Dict[Path, Path], heuristic: SearchHeuristic, examples: Examples) -> int:
+        # Evicts the least promising paths if the path store grows beyond the soft limit. Returns the number of evicted paths.
+        if self.soft_limit == math.inf or self.update(paths) <= self.soft_limit:
+            return 0
+        target = self.soft_limit * (1 - self.evict_fraction)
+        ranked = sorted(paths, key=lambda p: (max_fuzzy_f_measure(p, examples), heuristic_score(heuristic, p, examples)))
+        evicted = 0
+        max_upper_bound = 0.0
+        for path in ranked:
+            if self.estimate <= target:
+                break
+            paths.pop(path, None)
+            self.estimate -= estimate_path_size(path)
+            max_upper_bound = max(max_upper_bound, path.upper_bound)
+            evicted += 1
+            LOG.debug("EVICTED PATH: {} UPPER BOUND: {}".format(path, path.upper_bound))
+        LOG.info("SOFT MEMLIMIT EXCEEDED. EVICTED {} PATHS WITH UPPER BOUNDS UP TO {}. ESTIMATED PATH STORE SIZE: {} BYTES".format(
+            evicted, max_upper_bound, self.estimate))
+        return evicted
@@ -1,19 +1,23 @@
 
-from typing import Dict, Optional, Set
+import itertools
+from typing import Dict, Iterable, Iterator, KeysView, Optional, Set, Tuple
 
-from .example import Example, Examples
+from .example import Example
 from .knowledge_graph import Predicate, Vertex
 from .linked_list import LinkedNode
 
 
 class Path:
+    __slots__ = ("edges", "max_score_found_on_path", "start_to_ends", "end_to_starts", "terminal_to_starts",
+                 "num_positive_starts", "num_negative_starts",
+                 "num_links", "heuristic_score", "upper_bound", "alternatives", "negatives_traced",
+                 "visited")
 
     @staticmethod
-    def from_examples(starting_examples: Examples):
+    def from_examples(starting_examples: Iterable[Example]):
         path = Path()
         for example in starting_examples:
-            path.start_to_ends.setdefault(example, set()).add(example.vertex)
-            path.end_to_starts.setdefault(example.vertex, set()).add(example)
+            path.connect(example.vertex, {example})
         return path
 
     def __init__(self):
@@ -21,9 +25,29 @@ class Path:
         # TODO figure out what to do with this field.
         self.max_score_found_on_path: float = 0
         self.start_to_ends: Dict[Example, Set[Vertex]] = {}
+        # Expandable end-points. End-points without outgoing links, such as literals, are kept by object ID instead.
         self.end_to_starts: Dict[Vertex, Set[Example]] = {}
+        self.terminal_to_starts: Dict[int, Set[Example]] = {}
+        self.num_positive_starts: int = 0
+        self.num_negative_starts: int = 0
+        self.num_links: int = 0
+        # Cached scores. Reset by connect whenever the path gains new links.
+        self.heuristic_score: Optional[float] = None
+        self.upper_bound: Optional[float] = None
+        # Predicate sequences that connect the same examples to the same end-points.
+        self.alternatives: Tuple[LinkedNode, ...] = ()
+        # False if negative examples have not been traced along this path yet. See LazyNegatives.
+        self.negatives_traced: bool = True
+        # Per starting point, its end-points on each shorter prefix of this path, longest prefix first. The sets belong to
+        # the prefixes and are shared by all their extensions instead of copied. Only kept for acyclic searches.
+        self.visited: Optional[Dict[Example, LinkedNode]] = None
 
-    def extend(self, paths: Dict['Path', 'Path'], s: Vertex, p: Predicate, o: Vertex) -> 'Path':
+    def extend(self, paths: Dict['Path', 'Path'], s: Vertex, p: Predicate, o: Vertex, acyclic: bool = False) -> Optional['Path']:
+        starting_points = self.get_starting_points_connected_to_endpoint(s)
+        if acyclic and any(self.on_walk(e, o) for e in starting_points):
+            starting_points = set(e for e in starting_points if not self.on_walk(e, o))
+            if len(starting_points) == 0:
+                return None
         edges = LinkedNode(p, self.edges)
         path = Path()
         path.edges = edges
@@ -31,20 +55,82 @@ class Path:
             path = paths[path]
         else:
             paths[path] = path
-        starting_points: Set[Example] = self.get_starting_points_connected_to_endpoint(s)
-        path.end_to_starts.setdefault(o, set()).update(starting_points)
-        for e in starting_points:
-            path.start_to_ends.setdefault(e, set()).add(o)
+            path.alternatives = tuple(LinkedNode(p, alternative) for alternative in self.alternatives)
+            path.negatives_traced = self.negatives_traced
+        if acyclic:
+            path.add_visited(self, starting_points)
+        path.connect(o, starting_points)
         return path
 
+    def add_visited(self, prefix: 'Path', starting_points: Set[Example]) -> None:
+        if self.visited is None:
+            self.visited = {}
+        for e in starting_points:
+            if e not in self.visited:
+                self.visited[e] = LinkedNode(prefix.start_to_ends[e], prefix.get_visited(e))
+
+    def get_visited(self, e: Example) -> Optional[LinkedNode]:
+        if self.visited is None:
+            return None
+        return self.visited.get(e)
+
+    def on_walk(self, e: Example, v: Vertex) -> bool:
+        # True if v was reached from e by this path or one of its prefixes, including e itself.
+        if v == e.vertex or v in self.start_to_ends.get(e, ()):
+            return True
+        node = self.get_visited(e)
+        while node is not None:
+            if v in node.value:
+                return True
+            node = node.prev
+        return False
+
+    def connect(self, o: Vertex, starting_points: Set[Example]) -> None:
+        if o.is_subject():
+            starts = self.end_to_starts.setdefault(o, set())
+        else:
+            starts = self.terminal_to_starts.setdefault(o.o_id, set())
+        num_starts = len(starts)
+        starts.update(starting_points)
+        if len(starts) == num_starts:
+            # Every starting point was already connected to o, so nothing changed.
+            return
+        self.num_links += len(starts) - num_starts
+        for e in starting_points:
+            ends = self.start_to_ends.get(e)
+            if ends is None:
+                ends = self.start_to_ends[e] = set()
+                if e.positive:
+                    self.num_positive_starts += 1
+                else:
+                    self.num_negative_starts += 1
+            ends.add(o)
+        self.heuristic_score = None
+        self.upper_bound = None
+
     def get_starting_points(self) -> Set[Example]:
         return set(self.start_to_ends.keys())
 
     def get_starting_points_connected_to_endpoint(self, o: Vertex) -> Set[Example]:
-        return self.end_to_starts.get(o, set())
+        if o.is_subject():
+            return self.end_to_starts.get(o, set())
+        return self.terminal_to_starts.get(o.o_id, set())
 
     def get_end_points(self) -> Set[Vertex]:
-        return set(self.end_to_starts.keys())
+        res = set(self.end_to_starts.keys())
+        res.update(Vertex.fromObjectId(o_id) for o_id in self.terminal_to_starts)
+        return res
+
+    def get_frontier(self) -> KeysView[Vertex]:
+        # The end-points that can be expanded. This is a view, so it must not be modified while the path is extended.
+        return self.end_to_starts.keys()
+
+    def get_end_point_starts(self) -> Iterator[Set[Example]]:
+        # The starting points connected to each end-point.
+        return itertools.chain(self.end_to_starts.values(), self.terminal_to_starts.values())
+
+    def num_end_points(self) -> int:
+        return len(self.end_to_starts) + len(self.terminal_to_starts)
 
     def get_end_points_connected_to_example(self, e: Example) -> Set[Vertex]:
         return self.start_to_ends.get(e, set())
@@ -61,6 +147,10 @@ class Path:
         return self.edges == other.edges
 
     def __str__(self):
-        if self.edges is None:
+        return Path.edges_to_str(self.edges)
+
+    @staticmethod
+    def edges_to_str(edges: Optional[LinkedNode]) -> str:
+        if edges is None:
             return ""
-        return " -> ".join(map(lambda e: str(e), self.edges))
+        return " -> ".join(map(lambda e: str(e), edges))
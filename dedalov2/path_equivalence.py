@@ -0,0 +1,46 @@
+import logging
+from typing import Dict, List, Set
+
+from .explanation import Explanation
+from .path import Path
+
+LOG = logging.getLogger('dedalov2.path_equivalence')
+
+
+def fingerprint(path: Path) -> int:
+    return hash(frozenset((e, frozenset(ends)) for e, ends in path.start_to_ends.items()))
+
+
+# Paths that connect exactly the same examples to exactly the same end-points give equivalent results when extended.
+# Only one path of every group is expanded. The predicate sequences of the others are kept as its alternatives.
+# Explanations are reported in the round in which they are found, so a path only represents other paths if all of its
+# explanations are found in the same round as theirs. Otherwise its explanations were reported without the alternatives.
+class PathGroups:
+
+    def __init__(self):
+        self.collapsed: int = 0
+
+    def collapse(self, explanations: Set[Explanation], paths: Dict[Path, Path]) -> Set[Path]:
+        # Returns the paths that were merged into another path of the given explanations.
+        num_values: Dict[Path, int] = {}
+        for exp in explanations:
+            num_values[exp.path] = num_values.get(exp.path, 0) + 1
+        groups: Dict[int, List[Path]] = {}
+        merged: Set[Path] = set()
+        for path, n in num_values.items():
+            if path not in paths or path.edges is None:
+                continue
+            group = groups.setdefault(fingerprint(path), [])
+            for representative in group:
+                if representative.start_to_ends == path.start_to_ends:
+                    representative.alternatives += (path.edges,) + path.alternatives
+                    paths.pop(path, None)
+                    merged.add(path)
+                    break
+            else:
+                if n == path.num_end_points():
+                    group.append(path)
+        if len(merged) > 0:
+            self.collapsed += len(merged)
+            LOG.debug("COLLAPSED {} EQUIVALENT PATHS, {} SO FAR".format(len(merged), self.collapsed))
+        return merged
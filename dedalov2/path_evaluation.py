@@ -1,7 +1,8 @@
 
+import heapq
 import logging
 import math
-from typing import Callable, Dict, Optional, Set
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from .example import Examples
 from .path import Path
@@ -10,15 +11,29 @@ from .path_pruner import PathPruner
 LOG = logging.getLogger('dedalov2.path_evaluation')
 SearchHeuristic = Callable[[Path, Examples], float]
 
+# Paths with priors get a bonus of up to PRIOR_WEIGHT times their best score in previous runs, less for expensive sequences.
+# The bonus is only given during the first PRIOR_ROUNDS rounds. After that, all paths are ordered by the heuristic alone.
+PRIOR_WEIGHT = 1.0
+PRIOR_COST_WEIGHT = 0.1
+PRIOR_ROUNDS = 10
+
 
 def find_best_path(heuristic: SearchHeuristic, paths: Dict[Path, Path], examples: Examples, pruner: PathPruner, max_length: float = float('inf')) -> Optional[Path]:
+    best_paths = find_best_paths(heuristic, paths, examples, pruner, 1, max_length=max_length)
+    if len(best_paths) == 0:
+        return None
+    return best_paths[0]
+
+
+def find_best_paths(heuristic: SearchHeuristic, paths: Dict[Path, Path], examples: Examples, pruner: PathPruner, beam: int,
+                    max_length: float = float('inf')) -> List[Path]:
     LOG.debug("EVALUATING {} POSSIBLE PATHS".format(len(paths)))
-    score = float('-inf')
-    res: Optional[Path] = None
+    # Min-heap of the best paths so far. The counter breaks ties in favor of paths evaluated first.
+    best: List[Tuple[float, int, Path]] = []
     paths_to_delete: Set[Path] = set()
     pruned: int = 0
     too_long: int = 0
-    for path in paths:
+    for i, path in enumerate(paths):
         if len(path) > max_length:
             paths_to_delete.add(path)
             too_long += 1
@@ -28,22 +43,29 @@ def find_best_path(heuristic: SearchHeuristic, paths: Dict[Path, Path], examples
             pruned += 1
             continue
 
-        new_score = heuristic(path, examples)
-        if new_score > score:
-            score = new_score
-            res = path
+        new_score = heuristic_score(heuristic, path, examples)
+        if len(best) < beam:
+            heapq.heappush(best, (new_score, -i, path))
+        elif new_score > best[0][0]:
+            heapq.heapreplace(best, (new_score, -i, path))
     for path in paths_to_delete:
         paths.pop(path, None)
     LOG.debug("PRUNED {} PATHS".format(pruned))
     LOG.debug("REMOVED {} TOO LONG PATHS".format(too_long))
     LOG.debug("NEXT ROUND HAS {} REMAINING PATHS".format(len(paths)))
-    return res
+    return [path for _, _, path in sorted(best, reverse=True)]
+
+
+def heuristic_score(heuristic: SearchHeuristic, path: Path, examples: Examples) -> float:
+    if path.heuristic_score is None:
+        path.heuristic_score = heuristic(path, examples)
+    return path.heuristic_score
 
 
 def entropy(p: Path, examples: Examples) -> float:
     res: float = 0
-    for obj in p.get_end_points():
-        num_roots = len(p.get_starting_points_connected_to_endpoint(obj))
+    for starts in p.get_end_point_starts():
+        num_roots = len(starts)
         frac = num_roots/len(examples)
         assert frac >= 0
         assert frac <= 1
@@ -52,9 +74,8 @@ def entropy(p: Path, examples: Examples) -> float:
 
 def entropy_corrected(p: Path, examples: Examples) -> float:
     res: float = 0
-    for obj in p.get_end_points():
+    for starting_points_to_obj in p.get_end_point_starts():
         frac: float = 0.0
-        starting_points_to_obj = p.get_starting_points_connected_to_endpoint(obj)
         for starting_point in starting_points_to_obj:
             numexamples = p.get_end_points_connected_to_example(starting_point)
             frac += 1 / (len(numexamples) * len(starting_points_to_obj))
@@ -64,6 +85,40 @@ def entropy_corrected(p: Path, examples: Examples) -> float:
     return res
 
 
+class PriorHeuristic:
+    # Adds a bonus to the score of paths whose predicates led to good explanations in previous runs. The other paths are
+    # ordered by the given heuristic. Scores are cached on the paths, so the scores with a bonus are reset when the prior rounds end.
+
+    def __init__(self, heuristic: SearchHeuristic, priors: Dict[Tuple[int, ...], Tuple[float, float]],
+                 rounds: int = PRIOR_ROUNDS):
+        self.heuristic: SearchHeuristic = heuristic
+        self.priors: Dict[Tuple[int, ...], Tuple[float, float]] = priors
+        self.rounds: int = rounds
+        self.boosted: Dict[int, Path] = {}
+
+    def __call__(self, p: Path, examples: Examples) -> float:
+        score = self.heuristic(p, examples)
+        if self.rounds <= 0 or p.edges is None:
+            return score
+        prior = self.priors.get(tuple(predicate.id for predicate in p.edges))
+        if prior is None:
+            return score
+        self.boosted[id(p)] = p
+        return score + self.bonus(prior)
+
+    @staticmethod
+    def bonus(prior: Tuple[float, float]) -> float:
+        best_score, cost = prior
+        return PRIOR_WEIGHT * max(best_score, 0) / (1 + PRIOR_COST_WEIGHT * math.log10(1 + cost))
+
+    def end_round(self) -> None:
+        self.rounds -= 1
+        if self.rounds == 0:
+            for p in self.boosted.values():
+                p.heuristic_score = None
+            self.boosted.clear()
+
+
 def shortest_path(p: Path, examples: Examples) -> float:
     return -float(len(p))
 
@@ -0,0 +1,122 @@
+import functools
+import logging
+import queue
+import threading
+from array import array
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from . import local_hdt
+from .adjacency import AdjacencyCache
+from .federation import FederatedDocument
+from .knowledge_graph import Vertex
+
+LOG = logging.getLogger('dedalov2.pipeline')
+
+BUFFER_TRIPLES = 4096
+NUM_BUFFERS = 8
+
+
+class TripleBuffer:
+    __slots__ = ("ids", "size")
+
+    def __init__(self, capacity: int):
+        # Flat (subject, predicate, object) ID triples.
+        self.ids: array = array('q', bytes(3 * capacity * array('q').itemsize))
+        self.size: int = 0
+
+    def capacity(self) -> int:
+        return len(self.ids) // 3
+
+
+_Item = Union[TripleBuffer, BaseException, None]
+# Returns the outgoing triples of a subject ID.
+_Lookup = Callable[[int], Iterable[Tuple[int, int, int]]]
+
+
+def outgoing_triples(nodes: List[Vertex], readers: int = 1, buffer_triples: int = BUFFER_TRIPLES,
+                     num_buffers: int = NUM_BUFFERS, adjacency: AdjacencyCache = None) -> Iterator[TripleBuffer]:
+    # Reader threads copy the outgoing triples of nodes from the HDT iterators into a fixed pool of buffers,
+    # while the caller consumes the full ones. A yielded buffer is reused once the caller asks for the next one.
+    # With one reader and a single HDT file, triples are yielded in the same order as reading the nodes one by one.
+    assert readers > 0
+    lookups = _lookups(adjacency)
+    free: queue.Queue = queue.Queue()
+    for _ in range(max(num_buffers, readers * len(lookups) + 1)):
+        free.put(TripleBuffer(buffer_triples))
+    full: queue.Queue = queue.Queue()
+    stop = threading.Event()
+    threads = [threading.Thread(target=_read, args=(nodes[i::readers], lookup, free, full, stop), daemon=True)
+               for lookup in lookups for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    done = 0
+    try:
+        while done < len(threads):
+            item: _Item = full.get()
+            if item is None:
+                done += 1
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+            item.size = 0
+            free.put(item)
+    finally:
+        stop.set()
+        # Hand back buffers until the readers notice they have to stop.
+        while any(thread.is_alive() for thread in threads):
+            try:
+                item = full.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if isinstance(item, TripleBuffer):
+                item.size = 0
+                free.put(item)
+
+
+def _lookups(adjacency: Optional[AdjacencyCache]) -> List[_Lookup]:
+    # Every reader reads its share of the nodes with each of the returned lookups. When multiple HDT files are searched
+    # together, there is a lookup per file, so that the files are read concurrently. The adjacency cache keeps all
+    # outgoing triples of a subject, so it is read through the whole document instead.
+    doc = local_hdt.document()
+    if adjacency is not None:
+        return [adjacency.triples]
+    if isinstance(doc, FederatedDocument):
+        return [functools.partial(doc.partition_triples, i, p=0, o=0) for i in range(len(doc.documents))]
+    return [_triples]
+
+
+def _triples(s_id: int) -> Iterable[Tuple[int, int, int]]:
+    triples, _ = local_hdt.document().search_triples_ids(s_id, 0, 0)
+    return triples
+
+
+def _read(nodes: List[Vertex], lookup: _Lookup, free: queue.Queue, full: queue.Queue, stop: threading.Event) -> None:
+    try:
+        buf: TripleBuffer = free.get()
+        ids = buf.ids
+        capacity = buf.capacity()
+        for node in nodes:
+            if stop.is_set():
+                break
+            for s_id, p_id, o_id in lookup(node.s_id):
+                i = buf.size * 3
+                ids[i] = s_id
+                ids[i + 1] = p_id
+                ids[i + 2] = o_id
+                buf.size += 1
+                if buf.size == capacity:
+                    full.put(buf)
+                    if stop.is_set():
+                        return
+                    buf = free.get()
+                    ids = buf.ids
+        if buf.size > 0:
+            full.put(buf)
+        else:
+            free.put(buf)
+    except BaseException as e:
+        LOG.error("Reading triples failed: {}".format(e))
+        full.put(e)
+    finally:
+        full.put(None)
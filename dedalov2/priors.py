@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+from typing import Dict, Iterator, Tuple
+
+import hdt
+from . import local_hdt
+from .explanation import Explanation
+
+LOG = logging.getLogger('dedalov2.priors')
+
+# Best score and expansion cost of a predicate sequence, by predicate IDs.
+Prior = Tuple[float, float]
+
+# A run only stores the sequences of explanations that score at least this fraction of its best score, and more than 0.
+RELATIVE_SCORE = 0.8
+# Maximum number of stored sequences. The sequences with the lowest best scores are dropped first.
+MAX_SEQUENCES = 10000
+
+
+class Priors:
+    # Outcomes of predicate sequences in previous runs. Sequences are stored by predicate URI, so they can be reused with other HDT files.
+
+    def __init__(self, filename: str):
+        self.filename: str = filename
+        self.sequences: Dict[Tuple[str, ...], Dict] = {}
+        self.seen: Dict[Tuple[int, ...], Prior] = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename) as fin:
+                    for data in json.load(fin)["sequences"]:
+                        self.sequences[tuple(data["predicates"])] = data
+            except (ValueError, KeyError) as err:
+                LOG.warning("Ignoring corrupt priors file {}: {}".format(filename, err))
+        LOG.debug("LOADED {} PREDICATE SEQUENCES FROM {}".format(len(self.sequences), filename))
+
+    def prefix_scores(self) -> Dict[Tuple[int, ...], Prior]:
+        # Every prefix of a stored sequence gets the best score and lowest cost of the sequences it leads to.
+        # Sequences with predicates that are not in the current HDT file are skipped.
+        doc = local_hdt.document()
+        res: Dict[Tuple[int, ...], Prior] = {}
+        for uris, data in self.sequences.items():
+            ids = tuple(doc.convert_term(uri, hdt.IdentifierPosition.Predicate) for uri in uris)
+            if any(p_id <= 0 for p_id in ids):
+                continue
+            for k in range(1, len(ids) + 1):
+                best, cost = res.get(ids[:k], (0.0, data["cost"]))
+                res[ids[:k]] = (max(best, data["best_score"]), min(cost, data["cost"]))
+        return res
+
+    def record(self, explanations: Iterator[Explanation]) -> Iterator[Explanation]:
+        # Passes on the given explanations and stores the outcome of their predicate sequences when the search ends.
+        # Nothing is stored if the search fails or the caller stops early.
+        for exp in explanations:
+            if exp.record is not None and exp.record.score > 0 and exp.path.edges is not None:
+                key = tuple(p.id for p in exp.path.edges)
+                best, cost = self.seen.get(key, (0.0, exp.path.num_links))
+                self.seen[key] = (max(best, exp.record.score), min(cost, exp.path.num_links))
+            yield exp
+        self.save()
+
+    def save(self) -> None:
+        doc = local_hdt.document()
+        threshold = RELATIVE_SCORE * max((best for best, _ in self.seen.values()), default=0)
+        for key, (best, cost) in self.seen.items():
+            if best < threshold:
+                continue
+            uris = tuple(doc.convert_id(p_id, hdt.IdentifierPosition.Predicate) for p_id in key)
+            data = self.sequences.setdefault(uris, {"predicates": list(uris), "best_score": 0.0, "cost": cost, "runs": 0})
+            data["best_score"] = max(data["best_score"], best)
+            data["cost"] = min(data["cost"], cost)
+            data["runs"] += 1
+        self.seen.clear()
+        if len(self.sequences) > MAX_SEQUENCES:
+            kept = sorted(self.sequences.values(), key=lambda data: (data["best_score"], data["runs"]), reverse=True)[:MAX_SEQUENCES]
+            self.sequences = {tuple(data["predicates"]): data for data in kept}
+        tmp_filename = "{}.{}.tmp".format(self.filename, os.getpid())
+        with open(tmp_filename, "w") as fout:
+            json.dump({"sequences": list(self.sequences.values())}, fout)
+        os.replace(tmp_filename, self.filename)
+        LOG.debug("STORED {} PREDICATE SEQUENCES IN {}".format(len(self.sequences), self.filename))
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .example import Example, Examples
+from .explanation import Explanation, Record
+from .knowledge_graph import Predicate, Vertex
+from .linked_list import LinkedNode
+from .path import Path
+
+LOG = logging.getLogger('dedalov2.result_cache')
+
+HEADER_BYTES = 1 << 16
+
+
+def hdt_fingerprint(hdt_file: str) -> str:
+    h = hashlib.sha256()
+    h.update(str(os.path.getsize(hdt_file)).encode())
+    with open(hdt_file, "rb") as fin:
+        h.update(fin.read(HEADER_BYTES))
+    return h.hexdigest()
+
+
+def file_fingerprint(filename: Optional[str]) -> Optional[str]:
+    if filename is None:
+        return None
+    with open(filename, "rb") as fin:
+        return hashlib.sha256(fin.read()).hexdigest()
+
+
+def examples_fingerprint(examples: Examples) -> List[Tuple[bool, int, int]]:
+    return sorted((e.positive, e.vertex.s_id, e.vertex.o_id) for e in examples)
+
+
+def _example_key(e: Example) -> Tuple[bool, int, int]:
+    return (e.positive, e.vertex.s_id, e.vertex.o_id)
+
+
+def _predicate_ids(edges: Optional[LinkedNode]) -> List[int]:
+    return [p.id for p in edges] if edges is not None else []
+
+
+def _edges(p_ids: List[int]) -> Optional[LinkedNode]:
+    edges: Optional[LinkedNode] = None
+    for p_id in p_ids:
+        edges = LinkedNode(Predicate.fromId(p_id), edges)
+    return edges
+
+
+class Recorder:
+
+    def __init__(self):
+        self.start_time: float = time.time()
+        self.rounds: int = 0
+        self.current_round: int = 0
+        self.exhausted: bool = False
+        self.explanations: List[Dict] = []
+
+    def start_round(self, round_number: int) -> None:
+        self.current_round = round_number
+
+    def add(self, exp: Explanation) -> None:
+        record = exp.record
+        self.explanations.append({
+            "round": self.current_round,
+            "time": time.time() - self.start_time,
+            "predicates": _predicate_ids(exp.path.edges),
+            "alternatives": [_predicate_ids(edges) for edges in exp.path.alternatives],
+            "value": [exp.value.s_id, exp.value.o_id],
+            "roots": [list(_example_key(e)) for e in exp.path.get_starting_points_connected_to_endpoint(exp.value)],
+            "score": record.score if record is not None else None,
+            "num_connected_positives": record.num_connected_positives if record is not None else None,
+            "num_connected_negatives": record.num_connected_negatives if record is not None else None,
+        })
+
+    def end_round(self, round_number: int) -> None:
+        self.rounds = round_number
+
+    def finish(self, exhausted: bool) -> None:
+        self.exhausted = exhausted
+
+    def to_dict(self) -> Dict:
+        return {
+            "rounds": self.rounds,
+            "runtime": time.time() - self.start_time,
+            "exhausted": self.exhausted,
+            "explanations": [e for e in self.explanations if e["round"] <= self.rounds],
+        }
+
+
+class CacheEntry:
+
+    def __init__(self, data: Dict):
+        self.rounds: int = data["rounds"]
+        self.runtime: float = data["runtime"]
+        self.exhausted: bool = data["exhausted"]
+        self.explanations: List[Dict] = data["explanations"]
+
+    def covers(self, rounds: float, runtime: float) -> bool:
+        return self.exhausted or rounds <= self.rounds or runtime <= self.runtime
+
+    def replay(self, examples: Examples, rounds: float = math.inf, runtime: float = math.inf) -> Iterator[Explanation]:
+        lookup: Dict[Tuple[bool, int, int], Example] = {_example_key(e): e for e in examples}
+        for data in self.explanations:
+            if data["round"] > rounds or data["time"] > runtime:
+                continue
+            yield self._to_explanation(data, lookup, examples)
+
+    @staticmethod
+    def _to_explanation(data: Dict, lookup: Dict[Tuple[bool, int, int], Example], examples: Examples) -> Explanation:
+        path = Path()
+        path.edges = _edges(data["predicates"])
+        # Entries written before alternatives were stored have none.
+        path.alternatives = tuple(_edges(p_ids) for p_ids in data.get("alternatives", []))
+        s_id, o_id = data["value"]
+        value = Vertex.fromObjectId(o_id) if o_id > 0 else Vertex.fromSubjectId(s_id)
+        path.connect(value, set(lookup[tuple(r)] for r in data["roots"]))
+        exp = Explanation(path, value)
+        if data["score"] is not None:
+            path.max_score_found_on_path = data["score"]
+            exp.record = Record(exp, data["score"], num_examples=len(examples), num_positives=len(examples.positives),
+                                num_connected_positives=data["num_connected_positives"],
+                                num_connected_negatives=data["num_connected_negatives"])
+        return exp
+
+
+class ResultCache:
+
+    def __init__(self, directory: str, max_size: int):
+        if os.path.exists(directory) and not os.path.isdir(directory):
+            raise ValueError("{} is not a directory.".format(directory))
+        os.makedirs(directory, exist_ok=True)
+        self.directory: str = directory
+        self.max_size: int = max_size
+
+    @staticmethod
+    def key(hdt_file: str, examples: Examples, **params) -> str:
+        content = {
+            "hdt": hdt_fingerprint(hdt_file),
+            "examples": examples_fingerprint(examples),
+            "params": params,
+        }
+        return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+    def _filename(self, key: str) -> str:
+        return os.path.join(self.directory, "{}.json".format(key))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        filename = self._filename(key)
+        try:
+            with open(filename) as fin:
+                entry = CacheEntry(json.load(fin))
+        except FileNotFoundError:
+            LOG.debug("CACHE MISS: {}".format(key))
+            return None
+        except (ValueError, KeyError) as err:
+            LOG.warning("Ignoring corrupt cache entry {}: {}".format(filename, err))
+            return None
+        # Touch the entry so that eviction sees it as recently used.
+        os.utime(filename)
+        LOG.debug("CACHE HIT: {} ROUNDS: {} EXHAUSTED: {}".format(key, entry.rounds, entry.exhausted))
+        return entry
+
+    def put(self, key: str, recorder: Recorder) -> None:
+        filename = self._filename(key)
+        tmp_filename = "{}.{}.tmp".format(filename, os.getpid())
+        with open(tmp_filename, "w") as fout:
+            json.dump(recorder.to_dict(), fout)
+        os.replace(tmp_filename, filename)
+        LOG.debug("CACHE STORE: {} ROUNDS: {} EXHAUSTED: {}".format(key, recorder.rounds, recorder.exhausted))
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+            total_size += stat.st_size
+        entries.sort()
+        for _, size, filename in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(filename)
+                LOG.debug("CACHE EVICT: {}".format(filename))
+            except FileNotFoundError:
+                pass
+            total_size -= size
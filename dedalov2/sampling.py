@@ -0,0 +1,103 @@
+import collections
+import logging
+import math
+from typing import Callable, Iterator, Tuple
+
+from . import explanation_evaluation
+from .example import Examples
+from .explanation import Explanation
+from .knowledge_graph import follow_predicates
+from .path import Path
+
+LOG = logging.getLogger('dedalov2.sampling')
+
+# Standard score of the two-sided 95% confidence interval.
+Z = 1.96
+# Number of paths traced from all examples that are kept for explanations along the same path.
+MAX_FULL_PATHS = 1000
+
+
+def wilson_interval(successes: int, n: int, z: float = Z) -> Tuple[float, float]:
+    if n == 0:
+        return (0.0, 1.0)
+    p = successes / n
+    denominator = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return (max(0.0, center - margin), min(1.0, center + margin))
+
+
+def _f_measure(tp: float, fp: float, num_positives: int) -> float:
+    # F-measure of tp true positives and fp false positives when there are num_positives positives in total.
+    if tp <= 0:
+        return 0.0
+    return 2 * tp / (tp + fp + num_positives)
+
+
+def fuzzy_f_measure_bounds(num_connected_positives: int, num_connected_negatives: int, sample: Examples,
+                           examples: Examples) -> Tuple[float, float]:
+    # Confidence interval of the F-measure on all examples, given the number of connected examples in the sample.
+    tp_low, tp_high = wilson_interval(num_connected_positives, len(sample.positives))
+    fp_low, fp_high = wilson_interval(num_connected_negatives, len(sample.negatives))
+    num_positives = len(examples.positives)
+    num_negatives = len(examples.negatives)
+    low = _f_measure(tp_low * num_positives, fp_high * num_negatives, num_positives)
+    high = _f_measure(tp_high * num_positives, fp_low * num_negatives, num_positives)
+    return (low, high)
+
+
+def max_fuzzy_f_measure_ucb(examples: Examples) -> Callable[[Path, Examples], float]:
+    # Upper confidence bound of explanation_evaluation.max_fuzzy_f_measure on all examples.
+    def f(p: Path, sample: Examples) -> float:
+        return fuzzy_f_measure_bounds(p.num_positive_starts, p.num_negative_starts, sample, examples)[1]
+    return f
+
+
+class Verifier:
+
+    def __init__(self, examples: Examples, sample: Examples, acyclic: bool = False):
+        self.examples: Examples = examples
+        self.acyclic: bool = acyclic
+        self.sample: Examples = sample
+        sampled = set(sample)
+        self.unsampled = [e for e in examples if e not in sampled]
+        # Recently traced paths from all examples, by predicate sequence.
+        self.full_paths: 'collections.OrderedDict[Path, Path]' = collections.OrderedDict()
+        self.best_lower_bound: float = 0.0
+        self.verified: int = 0
+        self.skipped: int = 0
+
+    def verify(self, explanations: Iterator[Explanation], minimum_score: float) -> Iterator[Explanation]:
+        # Explanations found on the sample are only checked against all examples if their upper confidence bound
+        # reaches both minimum_score and the best lower confidence bound seen so far.
+        # Explanations below that lower bound are dropped, also if they would reach minimum_score.
+        for exp in explanations:
+            record = exp.record
+            low, high = fuzzy_f_measure_bounds(record.num_connected_positives, record.num_connected_negatives, self.sample, self.examples)
+            self.best_lower_bound = max(self.best_lower_bound, low)
+            if high < minimum_score or high < self.best_lower_bound:
+                self.skipped += 1
+                continue
+            self.verified += 1
+            full_exp = Explanation(self._full_path(exp.path), exp.value)
+            explanation_evaluation.find_best_explanation({full_exp}, self.examples)
+            if full_exp.record.score >= minimum_score:
+                yield full_exp
+        LOG.debug("VERIFIED {} EXPLANATIONS. SKIPPED {}".format(self.verified, self.skipped))
+
+    def _full_path(self, path: Path) -> Path:
+        full_path = self.full_paths.get(path)
+        if full_path is not None:
+            self.full_paths.move_to_end(path)
+            return full_path
+        full_path = Path()
+        full_path.edges = path.edges
+        for v in path.get_end_points():
+            full_path.connect(v, path.get_starting_points_connected_to_endpoint(v))
+        for e in self.unsampled:
+            for v in follow_predicates(e.vertex, path.edges, acyclic=self.acyclic):
+                full_path.connect(v, {e})
+        self.full_paths[full_path] = full_path
+        if len(self.full_paths) > MAX_FULL_PATHS:
+            self.full_paths.popitem(last=False)
+        return full_path
@@ -16,7 +16,7 @@ setuptools.setup(
     package_dir={"": "."},
     packages=["dedalov2"],
     install_requires=[
-        "hdt>=2.2.1",
+        "hdt>=2.3",
         "psutil>=5.6.3",
     ],
     url="https://github.com/jdonkervliet/dedalov2",
@@ -0,0 +1,39 @@
+import math
+import unittest
+
+from benchmarks.synthetic import SyntheticGraph
+from dedalov2 import ddl, explanation_evaluation, knowledge_graph, local_hdt
+from dedalov2.path_pruner import PATH_PRUNER_NAMES
+
+
+class SyntheticTestCase(unittest.TestCase):
+    # Searches a small synthetic graph instead of an HDT file. The graph is removed again after every test,
+    # so that it does not leak into other tests.
+    GRAPH = dict(num_examples=20, level_size=200, depth=2, num_predicates=10, fanout=4, seed=1)
+
+    def setUp(self):
+        self.use(SyntheticGraph(**self.GRAPH))
+
+    def tearDown(self):
+        local_hdt.doc = None
+        local_hdt.nb_shared = math.inf
+        knowledge_graph.clear_interned()
+
+    def use(self, graph):
+        self.graph = graph
+        local_hdt.doc = graph
+        local_hdt.nb_shared = math.inf
+        knowledge_graph.clear_interned()
+        self.examples = graph.examples()
+
+    def pruner(self, prune="off"):
+        return PATH_PRUNER_NAMES[prune](explanation_evaluation.max_fuzzy_f_measure, self.examples)
+
+    def search(self, prune="off", complete=2, **kwargs):
+        # Without pruning, the complete search finds every explanation up to the given length, in any order of triples.
+        return list(ddl._explain(self.examples, self.pruner(prune), complete=complete, **kwargs))
+
+
+def summary(explanations):
+    return sorted((str(exp), exp.record.score, exp.record.num_connected_positives, exp.record.num_connected_negatives)
+                  for exp in explanations)
@@ -0,0 +1,49 @@
+import unittest
+
+from benchmarks.synthetic import SyntheticGraph
+from dedalov2.knowledge_graph import Predicate, Vertex, follow_predicates
+from dedalov2.memory_governor import estimate_path_size
+from dedalov2.path import Path
+from synthetic_case import SyntheticTestCase
+
+# Predicate 12 links the objects of predicate 1 back to their subjects, like owl:sameAs links in both directions.
+BACK = 12
+
+
+class TestAcyclic(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.graph.add_triples([(o, BACK, s) for triples in self.graph.outgoing.values() for s, p, o in triples if p == 1])
+        self.use(self.graph)
+
+    def test_same_as_follow_predicates(self):
+        explanations = self.search(complete=3, acyclic=True)
+        self.assertLess(len(explanations), len(self.search(complete=3)))
+        for exp in explanations:
+            expected = set(e for e in self.examples if exp.value in follow_predicates(e.vertex, exp.path.edges, acyclic=True))
+            self.assertEqual(exp.path.get_starting_points_connected_to_endpoint(exp.value), expected, str(exp))
+
+    def test_shared_visited(self):
+        # 1 -a-> 3 -b-> 1 returns to the example, 1 -a-> 3 -b-> 4 does not.
+        a, b = 1, 2
+        graph = SyntheticGraph(num_examples=2, level_size=1, depth=0)
+        graph.add_triples([(1, a, 3), (3, b, 1), (3, b, 4)])
+        self.use(graph)
+        e = next(e for e in self.examples if e.vertex.s_id == 1)
+        paths = {}
+        first = Path.from_examples(self.examples).extend(paths, e.vertex, Predicate.fromId(a), Vertex.fromObjectId(3), acyclic=True)
+        second = first.extend(paths, Vertex.fromSubjectId(3), Predicate.fromId(b), Vertex.fromObjectId(4), acyclic=True)
+        self.assertIsNone(first.extend(paths, Vertex.fromSubjectId(3), Predicate.fromId(b), Vertex.fromObjectId(1), acyclic=True))
+        # The end-points of the prefix are shared, not copied.
+        self.assertIs(second.visited[e].value, first.start_to_ends[e])
+        self.assertIs(second.visited[e].prev, first.visited[e])
+        self.assertEqual(second.get_end_points(), {Vertex.fromObjectId(4)})
+        plain = Path()
+        plain.edges = second.edges
+        plain.connect(Vertex.fromObjectId(4), {e})
+        self.assertGreater(estimate_path_size(second), estimate_path_size(plain))
+
+
+if __name__ == '__main__':
+    unittest.main()
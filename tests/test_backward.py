@@ -0,0 +1,53 @@
+import unittest
+
+from dedalov2 import backward, ddl
+from synthetic_case import SyntheticTestCase, summary
+
+
+class TestBackward(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.num_triples = 0
+        search_triples_ids = self.graph.search_triples_ids
+
+        def counted(s, p, o):
+            triples, k = search_triples_ids(s, p, o)
+            return self.count(triples), k
+        self.graph.search_triples_ids = counted
+
+    def count(self, triples):
+        for triple in triples:
+            self.num_triples += 1
+            yield triple
+
+    def forward(self):
+        last_level = []
+        values = set(exp.value for exp in ddl._explain_complete(self.examples, self.pruner(), complete=1, last_level=last_level))
+        self.num_triples = 0
+        return last_level, values
+
+    def test_same_as_complete(self):
+        complete = summary(self.search(complete=2))
+        bidirectional = summary(self.search(complete=0, bidirectional=2))
+        self.assertLessEqual(set(bidirectional), set(complete))
+        self.assertEqual(max(score for _, score, _, _ in bidirectional), max(score for _, score, _, _ in complete))
+
+    def test_triple_limit(self):
+        last_level, values = self.forward()
+        best = backward.find_candidates(last_level, 1, self.examples, exclude=values)
+        self.assertGreater(self.num_triples, 10)
+        # The best scoring end-points are followed first, so the best candidate is found within the limit.
+        self.num_triples = 0
+        limited = backward.find_candidates(last_level, 1, self.examples, exclude=values, limit=10)
+        self.assertLessEqual(self.num_triples, 10)
+        self.assertEqual(limited[0], best[0])
+
+    def test_runtime(self):
+        last_level, values = self.forward()
+        self.assertEqual(backward.find_candidates(last_level, 1, self.examples, exclude=values, end_time=0), [])
+        self.assertEqual(self.num_triples, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
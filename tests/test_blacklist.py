@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from benchmarks.synthetic import PREFIX
+from dedalov2 import explanation_evaluation
+from dedalov2.blacklist import Blacklist
+from dedalov2.knowledge_graph import Predicate
+from synthetic_case import SyntheticTestCase
+
+
+class TestBlacklist(SyntheticTestCase):
+    GRAPH = dict(SyntheticTestCase.GRAPH, num_predicates=30)
+
+    def from_lines(self, lines):
+        fd, filename = tempfile.mkstemp()
+        self.addCleanup(os.remove, filename)
+        with os.fdopen(fd, "w") as fout:
+            fout.write("\n".join(lines) + "\n")
+        return Blacklist.fromFile(filename)
+
+    def test_no_file(self):
+        self.assertEqual(Blacklist.fromFile(None).blacklisted_ids, set())
+
+    def test_missing_file(self):
+        with self.assertRaises(ValueError):
+            Blacklist.fromFile(os.path.join(tempfile.gettempdir(), "does-not-exist.txt"))
+
+    def test_every_line(self):
+        bl = self.from_lines([PREFIX + "p1", "", "# " + PREFIX + "p2", "  " + PREFIX + "p3  ", PREFIX + "p30"])
+        self.assertEqual(bl.blacklisted_ids, {1, 3, 30})
+        self.assertTrue(bl.isBlacklisted(Predicate.fromId(3)))
+        self.assertFalse(bl.isBlacklistedId(2))
+
+    def test_unknown_predicates_are_skipped(self):
+        bl = self.from_lines(["http://example.com/unknown", PREFIX + "p4", PREFIX + "v4"])
+        self.assertEqual(bl.blacklisted_ids, {4})
+
+    def test_prefix(self):
+        # p1 and p10 up to p19.
+        bl = self.from_lines([PREFIX + "p1*"])
+        self.assertEqual(bl.blacklisted_ids, {1} | set(range(10, 20)))
+
+    def test_pattern(self):
+        bl = self.from_lines(["^" + PREFIX + r"p2\d$", "^[invalid", PREFIX + "p5"])
+        self.assertEqual(bl.blacklisted_ids, set(range(20, 30)) | {5})
+
+    def test_uninformative(self):
+        # Predicates that score no better than the trivial explanation one step away, computed with sets of examples.
+        trivial = explanation_evaluation._fuzzy_f_measure(set(self.examples), self.examples)
+        roots = {}
+        for e in self.examples:
+            if not e.vertex.is_subject():
+                continue
+            triples, _ = self.graph.search_triples_ids(e.vertex.s_id, 0, 0)
+            for _, p_id, o_id in triples:
+                roots.setdefault(p_id, {}).setdefault(o_id, set()).add(e)
+        expected = set(p_id for p_id, objects in roots.items()
+                       if max(explanation_evaluation._fuzzy_f_measure(starts, self.examples) for starts in objects.values()) <= trivial)
+        bl = Blacklist()
+        bl.addUninformative(self.examples, 0)
+        self.assertEqual(bl.blacklisted_ids, expected)
+        self.assertGreater(len(expected), 0)
+        bl = Blacklist()
+        bl.addUninformative(self.examples, self.graph.num_triples)
+        self.assertEqual(bl.blacklisted_ids, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import functools
+import itertools
+import operator
+import random
+import unittest
+
+from dedalov2 import explanation_evaluation
+from dedalov2.combination import Combination, Combiner
+from synthetic_case import SyntheticTestCase
+
+
+class TestCombiner(SyntheticTestCase):
+
+    def test_upper_bound(self):
+        # No combination that adds explanations to bits scores better than the upper bound.
+        combiner = Combiner(self.examples)
+        rnd = random.Random(0)
+        for _ in range(200):
+            bits = rnd.getrandbits(len(self.examples))
+            others = [rnd.getrandbits(len(self.examples)) for _ in range(3)]
+            for conjunctive in (True, False):
+                op = operator.and_ if conjunctive else operator.or_
+                rest = functools.reduce(op, others, combiner.positives | combiner.negatives if conjunctive else 0)
+                bound = combiner.upper_bound(bits, rest, conjunctive)
+                for size in range(len(others) + 1):
+                    for added in itertools.combinations(others, size):
+                        self.assertLessEqual(combiner.score(functools.reduce(op, added, bits)), bound)
+
+    def test_combinations(self):
+        explanations = self.search()
+        combiner = Combiner(self.examples, size=2, candidates=30)
+        combined = list(combiner.combine(iter(explanations), 0))
+        self.assertEqual(combined[:len(explanations)], explanations)
+        combinations = combined[len(explanations):]
+        self.assertGreater(len(combinations), 0)
+        scores = [c.record.score for c in combinations]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        for c in combinations:
+            self.assertIsInstance(c, Combination)
+            self.assertAlmostEqual(c.record.score, explanation_evaluation._fuzzy_f_measure(c.explains(self.examples), self.examples))
+            self.assertGreater(c.record.score, max(exp.record.score for exp in c.explanations))
+
+    def test_no_pair_missed(self):
+        # Pruning with the upper bound does not lose any pair that scores better than both of its explanations.
+        explanations = self.search()
+        combiner = Combiner(self.examples, size=2, candidates=30)
+        for exp in explanations:
+            combiner.add(exp)
+        found = set(combiner.bitset(c.explains(self.examples)) for c in combiner.combinations(0))
+        candidates = [(combiner.bitset(exp.explains(self.examples)), exp.record.score) for _, _, _, exp in combiner.top]
+        for (a, a_score), (b, b_score) in itertools.combinations(candidates, 2):
+            for bits in (a & b, a | b):
+                if combiner.score(bits) > max(a_score, b_score):
+                    self.assertIn(bits, found)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import socket
+import threading
+import unittest
+
+from dedalov2 import distributed
+from synthetic_case import SyntheticTestCase, summary
+
+FINGERPRINT = "synthetic"
+
+
+class TestDistributed(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.servers = []
+        for fingerprint in (FINGERPRINT, FINGERPRINT, "other"):
+            server = distributed.make_server("127.0.0.1", 0, fingerprint)
+            threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+            self.servers.append(server)
+        self.addresses = ["127.0.0.1:{}".format(server.server_address[1]) for server in self.servers]
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+        super().tearDown()
+
+    def found(self, pool=None):
+        return summary(self.search(workers=pool))
+
+    def test_same_explanations_as_local_search(self):
+        local = self.found()
+        pool = distributed.WorkerPool(self.addresses, FINGERPRINT)
+        try:
+            self.assertEqual(len(pool.workers), 2)
+            self.assertEqual(self.found(pool), local)
+        finally:
+            pool.close()
+        self.assertGreater(len(local), 0)
+
+    def test_failed_workers(self):
+        local = self.found()
+        pool = distributed.WorkerPool(self.addresses, FINGERPRINT)
+        try:
+            pool.workers[0].sock.close()
+            self.assertEqual(self.found(pool), local)
+            pool.workers[1].sock.close()
+            self.assertEqual(self.found(pool), local)
+        finally:
+            pool.close()
+
+    def test_no_worker_available(self):
+        with self.assertRaises(ValueError):
+            distributed.WorkerPool(self.addresses[2:], FINGERPRINT)
+
+    def test_oversized_request(self):
+        sock = socket.create_connection(self.servers[0].server_address)
+        try:
+            kind, _ = distributed._recv(sock, distributed.MAX_RESPONSE_BYTES)
+            self.assertEqual(kind, distributed.HELLO)
+            sock.sendall(distributed.HEADER.pack(distributed.SHARD, distributed.MAX_REQUEST_BYTES + 1))
+            kind, _ = distributed._recv(sock, distributed.MAX_RESPONSE_BYTES)
+            self.assertEqual(kind, distributed.ERROR)
+        finally:
+            sock.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from dedalov2.example import Example, Examples
+from dedalov2.knowledge_graph import Vertex
+
+
+def make_examples(num_positives, num_negatives):
+    examples = Examples()
+    for i in range(1, num_positives + num_negatives + 1):
+        examples.add_example(Example(Vertex(s_id=i, o_id=i), i <= num_positives))
+    return examples
+
+
+class TestSample(unittest.TestCase):
+
+    def test_keeps_ratio(self):
+        examples = make_examples(30, 10)
+        sample = examples.sample(8)
+        self.assertEqual((len(sample.positives), len(sample.negatives)), (6, 2))
+        self.assertTrue(set(sample.positives) <= set(examples.positives))
+        self.assertTrue(set(sample.negatives) <= set(examples.negatives))
+
+    def test_keeps_one_of_each(self):
+        sample = make_examples(38, 2).sample(4)
+        self.assertEqual((len(sample.positives), len(sample.negatives)), (3, 1))
+        sample = make_examples(2, 38).sample(4)
+        self.assertEqual((len(sample.positives), len(sample.negatives)), (1, 3))
+        sample = make_examples(20, 20).sample(1)
+        self.assertEqual((len(sample.positives), len(sample.negatives)), (1, 0))
+
+    def test_only_positives(self):
+        sample = make_examples(10, 0).sample(4)
+        self.assertEqual((len(sample.positives), len(sample.negatives)), (4, 0))
+
+    def test_seed(self):
+        examples = make_examples(30, 30)
+        self.assertEqual(list(examples.sample(10, seed=1)), list(examples.sample(10, seed=1)))
+        self.assertNotEqual(list(examples.sample(10, seed=1)), list(examples.sample(10, seed=2)))
+
+    def test_keeps_order(self):
+        examples = make_examples(30, 30)
+        sample = examples.sample(10)
+        order = {e: i for i, e in enumerate(examples)}
+        self.assertEqual(list(sample), sorted(sample, key=order.get))
+
+
+if __name__ == '__main__':
+    unittest.main()
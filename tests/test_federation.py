@@ -0,0 +1,62 @@
+import unittest
+
+import hdt
+
+from benchmarks.synthetic import SyntheticGraph
+from dedalov2 import knowledge_graph, local_hdt, pipeline
+from dedalov2.example import Example, Examples
+from dedalov2.federation import FederatedDocument
+from synthetic_case import SyntheticTestCase, summary
+
+
+class TestFederation(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Every third triple is stored in both partitions, like a triple that occurs in two source datasets.
+        triples = sorted(t for triples in self.graph.outgoing.values() for t in triples)
+        self.partitions = [SyntheticGraph(num_examples=self.graph.num_examples, level_size=1, depth=0) for _ in range(2)]
+        for k, triple in enumerate(triples):
+            for i, partition in enumerate(self.partitions):
+                if k % 3 == 0 or k % 2 == i:
+                    partition.add_triples([triple])
+
+    def federate(self):
+        uris = [(self.graph.convert_id(e.vertex.o_id, hdt.IdentifierPosition.Object), e.positive) for e in self.examples]
+        local_hdt.doc = FederatedDocument(self.partitions)
+        knowledge_graph.clear_interned()
+        self.examples = Examples()
+        for uri, positive in uris:
+            self.examples.add_example(Example.fromString(uri, positive))
+
+    def test_search_triples_ids(self):
+        s_id = max(self.graph.outgoing, key=lambda s_id: len(self.graph.outgoing[s_id]))
+        s = self.graph.convert_id(s_id, hdt.IdentifierPosition.Subject)
+        expected, _ = self.graph.search_triples_ids(s_id, 0, 0)
+        expected = [tuple(self.graph.convert_id(id, pos) for id, pos in zip(t, self.positions())) for t in expected]
+        self.assertGreater(len(expected), 2)
+        self.federate()
+        doc = local_hdt.document()
+        triples, k = doc.search_triples_ids(doc.convert_term(s, hdt.IdentifierPosition.Subject), 0, 0)
+        self.assertEqual(k, len(expected))
+        self.assertCountEqual([tuple(doc.convert_id(id, pos) for id, pos in zip(t, self.positions())) for t in triples], expected)
+
+    @staticmethod
+    def positions():
+        return hdt.IdentifierPosition.Subject, hdt.IdentifierPosition.Predicate, hdt.IdentifierPosition.Object
+
+    def test_same_as_single_file(self):
+        expected = summary(self.search(complete=2))
+        self.federate()
+        # The readers of the pipeline read each partition separately.
+        self.assertEqual(len(pipeline._lookups(None)), len(self.partitions))
+        for readers in (0, 1, 2):
+            with self.subTest(readers=readers):
+                for partition in self.partitions:
+                    partition.triples_read = 0
+                self.assertEqual(summary(self.search(complete=2, readers=readers)), expected)
+                self.assertTrue(all(partition.triples_read > 0 for partition in self.partitions))
+
+
+if __name__ == '__main__':
+    unittest.main()
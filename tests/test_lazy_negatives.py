@@ -0,0 +1,27 @@
+import unittest
+
+from synthetic_case import SyntheticTestCase, summary
+
+
+class TestLazyNegatives(SyntheticTestCase):
+
+    def found(self, minimum_score, lazy_negatives):
+        return summary(self.search(minimum_score=minimum_score, lazy_negatives=lazy_negatives))
+
+    def test_same_explanations_as_eager_search(self):
+        for minimum_score in (0.1, 0.3, 0.5):
+            with self.subTest(minimum_score=minimum_score):
+                eager = self.found(minimum_score, False)
+                self.assertGreater(len(eager), 0)
+                self.assertEqual(self.found(minimum_score, True), eager)
+
+    def test_fewer_links_read(self):
+        self.found(0.5, False)
+        eager = self.graph.triples_read
+        self.graph.triples_read = 0
+        self.found(0.5, True)
+        self.assertLess(self.graph.triples_read, eager)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -70,5 +70,14 @@ class TestLinkedList(unittest.TestCase):
         l2 = LinkedNode(2, l)
         self.assertEqual(str(l2), "[1,2]")
 
+    def test_slots(self):
+        l = LinkedNode(1)
+        l2 = LinkedNode(2, l)
+        self.assertFalse(hasattr(l2, "__dict__"))
+        with self.assertRaises(AttributeError):
+            l2.other = 3
+        self.assertEqual(len(l2), 2)
+        self.assertEqual(hash(l2), hash(LinkedNode(2, LinkedNode(1))))
+
 if __name__ == '__main__':
     unittest.main()
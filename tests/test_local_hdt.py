@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from dedalov2 import local_hdt
+
+
+class TestLocalHDT(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.hdt_file = os.path.join(self.directory, "graph.hdt")
+        self.index_file = self.hdt_file + local_hdt.INDEX_SUFFIXES[0]
+        self.write(self.hdt_file, b"hdt")
+
+    @staticmethod
+    def write(filename, data):
+        with open(filename, "wb") as fout:
+            fout.write(data)
+
+    def test_missing_index(self):
+        self.assertIsNone(local_hdt.find_index(self.hdt_file))
+
+    def test_empty_index(self):
+        self.write(self.index_file, b"")
+        self.assertIsNone(local_hdt.find_index(self.hdt_file))
+        self.assertFalse(os.path.exists(self.index_file))
+        self.assertTrue(os.path.exists(self.index_file + local_hdt.STALE_SUFFIX))
+
+    def test_copied_index(self):
+        # An index that is older than its HDT file, for example after copying both, is still used.
+        self.write(self.index_file, b"index")
+        os.utime(self.index_file, (0, 0))
+        self.assertEqual(local_hdt.find_index(self.hdt_file), self.index_file)
+
+    def test_open_keeps_mapping(self):
+        self.write(self.index_file, b"index")
+        with mock.patch.object(local_hdt.hdt, "HDTDocument") as document:
+            local_hdt._open(self.hdt_file, False)
+            local_hdt._open(self.hdt_file, True)
+        self.assertEqual(document.call_args_list, [mock.call(self.hdt_file)] * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
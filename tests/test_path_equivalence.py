@@ -0,0 +1,74 @@
+import unittest
+
+from benchmarks.synthetic import PREFIX, SyntheticGraph
+from dedalov2 import ddl, path_evaluation
+from dedalov2.path import Path
+from dedalov2.result_cache import CacheEntry, Recorder
+from synthetic_case import SyntheticTestCase
+
+# Predicate 11 duplicates the links of predicate 1, like rdfs:label and skos:prefLabel.
+ALIAS = 11
+
+
+def num_end_points(path, examples):
+    return float(path.num_end_points())
+
+
+class TestCollapse(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.graph.add_triples([(s, ALIAS, o) for triples in self.graph.outgoing.values() for s, p, o in triples if p == 1])
+        self.use(self.graph)
+
+    def reported(self, **kwargs):
+        # The values and scores reported for every predicate sequence, including alternatives, when the explanation is reported.
+        res = {}
+        for exp in ddl._explain(self.examples, self.pruner(), **kwargs):
+            for edges in (exp.path.edges,) + exp.path.alternatives:
+                res.setdefault(Path.edges_to_str(edges), set()).add((exp.value, exp.record.score))
+        return res
+
+    def assertSameReported(self, **kwargs):
+        collapsed = self.search(collapse=True, **kwargs)
+        self.assertTrue(any(len(exp.path.alternatives) > 0 for exp in collapsed))
+        self.assertLess(len(collapsed), len(self.search(**kwargs)))
+        self.assertEqual(self.reported(collapse=True, **kwargs), self.reported(**kwargs))
+
+    def test_complete(self):
+        self.assertSameReported(complete=2)
+
+    def test_best_first(self):
+        # Paths are explored until none is left, so both searches find every path.
+        for heuristic in (num_end_points, path_evaluation.entropy):
+            with self.subTest(heuristic=heuristic.__name__):
+                self.assertSameReported(complete=0, heuristic=heuristic, beam=3)
+
+    def test_equivalent_to_earlier_path(self):
+        # 1 -a-> 3 -k-> 5 is found in round 2, and connects example 1 to 5 like 1 -d-> 5 from round 1.
+        # Vertex 4 gives path a more end-points than path d, so that a is explored first.
+        a, d, k, m, x = 2, 1, 3, 4, 5
+        graph = SyntheticGraph(num_examples=2, level_size=1, depth=0)
+        graph.add_triples([(1, d, 5), (1, a, 3), (1, a, 4), (3, k, 5), (4, m, 6), (2, x, 7)])
+        self.use(graph)
+        found = self.reported(complete=0, heuristic=num_end_points, rounds=3)
+        self.assertIn(self.path(a, k), found)
+        self.assertEqual(self.reported(complete=0, heuristic=num_end_points, rounds=3, collapse=True), found)
+
+    @staticmethod
+    def path(*predicates):
+        return " -> ".join("{}p{}".format(PREFIX, p) for p in predicates)
+
+    def test_cached(self):
+        recorder = Recorder()
+        collapsed = []
+        for exp in self.search(complete=2, collapse=True, recorder=recorder):
+            recorder.add(exp)
+            collapsed.append(exp)
+        replayed = list(CacheEntry(recorder.to_dict()).replay(self.examples))
+        self.assertEqual([str(exp) for exp in replayed], [str(exp) for exp in collapsed])
+        self.assertTrue(any(len(exp.path.alternatives) > 0 for exp in replayed))
+
+
+if __name__ == '__main__':
+    unittest.main()
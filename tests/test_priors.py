@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from dedalov2 import ddl, path_evaluation, priors
+from dedalov2.path_evaluation import PriorHeuristic
+from dedalov2.priors import Priors
+from synthetic_case import SyntheticTestCase
+
+
+class TestPriors(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.filename = os.path.join(tmp.name, "priors.json")
+
+    def stored(self):
+        with open(self.filename) as fin:
+            return json.load(fin)["sequences"]
+
+    def record(self, heuristic=path_evaluation.entropy, rounds=20):
+        store = Priors(self.filename)
+        return list(store.record(ddl._explain(self.examples, self.pruner(), complete=0, heuristic=heuristic, rounds=rounds)))
+
+    def test_only_best_sequences(self):
+        explanations = self.record()
+        best = max(exp.record.score for exp in explanations)
+        self.assertTrue(any(exp.record.score <= 0 for exp in explanations))
+        sequences = self.stored()
+        self.assertGreater(len(sequences), 0)
+        self.assertLess(len(sequences), len(explanations))
+        for data in sequences:
+            self.assertGreaterEqual(data["best_score"], priors.RELATIVE_SCORE * best)
+
+    def test_max_sequences(self):
+        store = Priors(self.filename)
+        for i in range(5):
+            uris = ("p{}".format(i),)
+            store.sequences[uris] = {"predicates": list(uris), "best_score": i / 10, "cost": 1, "runs": 1}
+        with mock.patch.object(priors, "MAX_SEQUENCES", 3):
+            store.save()
+        self.assertEqual(sorted(data["best_score"] for data in self.stored()), [0.2, 0.3, 0.4])
+
+    def test_first_rounds(self):
+        self.record()
+        best = max(data["best_score"] for data in self.stored())
+        heuristic = PriorHeuristic(path_evaluation.entropy, Priors(self.filename).prefix_scores(), rounds=2)
+        # The priors lead to the best explanation of the previous run sooner than the heuristic alone.
+        self.assertEqual(max(exp.record.score for exp in self.record(heuristic=heuristic, rounds=2)), best)
+        self.assertLess(max(exp.record.score for exp in self.record(rounds=2)), best)
+
+    def test_bonus(self):
+        examples = self.examples
+        paths = {}
+        for exp in ddl._explain(examples, self.pruner(), complete=1):
+            paths[exp.path] = exp.path
+        priors_by_id = {(p.edges[0].id,): (i / len(paths), 100) for i, p in enumerate(paths)}
+        heuristic = PriorHeuristic(path_evaluation.entropy, priors_by_id, rounds=1)
+        for p in paths:
+            bonus = heuristic(p, examples) - path_evaluation.entropy(p, examples)
+            self.assertGreaterEqual(bonus, 0)
+            self.assertLessEqual(bonus, path_evaluation.PRIOR_WEIGHT * priors_by_id[(p.edges[0].id,)][0])
+            p.heuristic_score = heuristic(p, examples)
+        heuristic.end_round()
+        for p in paths:
+            self.assertIsNone(p.heuristic_score)
+            self.assertEqual(heuristic(p, examples), path_evaluation.entropy(p, examples))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+from dedalov2 import ddl
+from dedalov2.result_cache import Recorder, ResultCache
+from synthetic_case import SyntheticTestCase, summary
+
+
+class TestResultCache(SyntheticTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def cached(self, results, key, rounds=math.inf):
+        # Replays the cached explanations of key, and searches and stores them if they are not cached.
+        recorder = Recorder()
+        search = ddl._explain(self.examples, self.pruner(), complete=2, recorder=recorder, rounds=rounds)
+        return list(ddl._cached(search, results, key, recorder, self.examples, rounds=rounds))
+
+    def test_replay(self):
+        results = ResultCache(self.directory, 2**20)
+        found = self.cached(results, "key")
+        self.assertEqual(summary(found), summary(self.search()))
+        entry = results.get("key")
+        self.assertTrue(entry.covers(math.inf, math.inf))
+        replayed = list(entry.replay(self.examples))
+        self.assertEqual(summary(replayed), summary(found))
+        for original, exp in zip(found, replayed):
+            self.assertEqual(exp.explains(self.examples), original.explains(self.examples))
+        # The complete search is not started again.
+        self.graph.triples_read = 0
+        self.assertEqual(summary(self.cached(results, "key")), summary(found))
+        self.assertEqual(self.graph.triples_read, 0)
+
+    def test_resume(self):
+        # A search that was stopped early is resumed, and the cached rounds are not reported twice.
+        results = ResultCache(self.directory, 2**20)
+        first = self.cached(results, "key", rounds=1)
+        self.assertFalse(results.get("key").exhausted)
+        self.assertEqual(results.get("key").rounds, 1)
+        resumed = self.cached(results, "key")
+        self.assertGreater(len(first), 0)
+        self.assertEqual(summary(resumed), summary(self.search()))
+        self.assertLess(len(first), len(resumed))
+        self.assertTrue(results.get("key").exhausted)
+
+    def test_missing(self):
+        results = ResultCache(self.directory, 2**20)
+        self.assertIsNone(results.get("key"))
+        with open(os.path.join(self.directory, "corrupt.json"), "w") as fout:
+            fout.write("{")
+        self.assertIsNone(results.get("corrupt"))
+
+    def test_evict(self):
+        results = ResultCache(self.directory, 2**20)
+        for i, key in enumerate(("first", "second", "third")):
+            self.cached(results, key)
+            os.utime(os.path.join(self.directory, "{}.json".format(key)), (i, i))
+        size = os.path.getsize(os.path.join(self.directory, "first.json"))
+        # Reading an entry marks it as recently used.
+        self.assertIsNotNone(results.get("first"))
+        # Entries differ slightly in size, because they store the time at which explanations were found.
+        results.max_size = 5 * size // 2
+        results.evict()
+        self.assertIsNone(results.get("second"))
+        self.assertIsNotNone(results.get("first"))
+        self.assertIsNotNone(results.get("third"))
+        results.max_size = 0
+        results.evict()
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
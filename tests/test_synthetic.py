@@ -0,0 +1,29 @@
+import unittest
+
+from benchmarks.benchmark import GRAPHS
+from benchmarks.synthetic import SyntheticGraph
+from dedalov2 import ddl
+from synthetic_case import SyntheticTestCase
+
+
+class TestSyntheticGraph(SyntheticTestCase):
+
+    def test_separable(self):
+        # Every benchmark graph but the largest has an explanation of length depth that separates the examples.
+        for name in ("small", "skewed", "deep"):
+            with self.subTest(graph=name):
+                graph = SyntheticGraph(seed=0, **GRAPHS[name])
+                self.use(graph)
+                best = max(ddl._explain(self.examples, self.pruner("gl"), rounds=20), key=lambda exp: exp.record.score)
+                self.assertGreater(best.record.score, 0.8)
+                self.assertEqual(len(best.path), GRAPHS[name]["depth"])
+                self.assertEqual(best.value.o_id, graph.separating_vertex())
+
+    def test_deterministic(self):
+        first = SyntheticGraph(seed=3, **GRAPHS["small"])
+        second = SyntheticGraph(seed=3, **GRAPHS["small"])
+        self.assertEqual(first.outgoing, second.outgoing)
+
+
+if __name__ == '__main__':
+    unittest.main()